@@ -1,19 +1,29 @@
 import os
 import sys
 import time
+import signal
 import random
 from datetime import datetime, timedelta
 import traceback
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv, find_dotenv
 
 # Importa todos os módulos necessários
-from scrapers.magazine_luiza import MagazineLuizaScraper
+from scrapers.magazine_luiza import MagazineLuizaScraper, MagazineLuizaCategoriesScraper
 from scrapers.mercado_livre import MercadoLivreScraper
 from scrapers.shopee import ShopeeScraper
 from social.whatsapp_poster import WhatsappPoster
 from social.instagram_poster import InstagramPoster
 from social.facebook_poster import FacebookPoster
-from database.database import init_db, deal_exists, add_deal, clean_old_deals
+from database.database import init_db, deals_exist_many, queue_deal, flush_pending, configure_write_buffer, start_expiry_worker, release_connection
+from database.canonical import deal_key
+from database.price_history import init_price_history, annotate_price_drops
+from database.affiliate_cache import init_affiliate_cache
+from database.feed_cursors import init_feed_cursors
+from database.keyword_stats import init_keyword_stats
+from database.shopee_reservoir import init_shopee_reservoir
 from utils.image_generator import ImageGenerator
 
 class DualLogger:
@@ -24,6 +34,10 @@ class DualLogger:
         self.log = open(self.filename, "a", encoding="utf-8")
         self.last_check = time.time()
         self.new_line = True
+        # Scrapers imprimem de várias threads: a rotação e a gravação das linhas
+        # ficam sob o lock, e cada thread acumula seu texto até o fim da linha
+        self._lock = threading.RLock()
+        self._pending = threading.local()
 
     def _rotate_if_needed(self):
         # Verifica a cada 60 segundos para evitar chamadas excessivas ao sistema de arquivos
@@ -45,16 +59,26 @@ class DualLogger:
                         os.rename(self.filename, new_name)
                     
                     self.log = open(self.filename, "a", encoding="utf-8")
-                    self.write(f"\n>>> [Log Rotation] Log rotacionado. Antigo: {new_name}\n")
+                    self._write_lines(f"\n>>> [Log Rotation] Log rotacionado. Antigo: {new_name}\n")
         except Exception as e:
             self.terminal.write(f"\n!!! Erro ao rotacionar log: {e}\n")
 
     def write(self, message):
-        self._rotate_if_needed()
-        
         if not message:
             return
 
+        # print() envia o texto e o '\n' em chamadas separadas; só as linhas
+        # completas são gravadas, para não misturar a saída de threads diferentes
+        text = getattr(self._pending, "text", "") + message
+        complete, newline, self._pending.text = text.rpartition("\n")
+        if not newline:
+            return
+
+        with self._lock:
+            self._rotate_if_needed()
+            self._write_lines(complete + newline)
+
+    def _write_lines(self, message):
         timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         lines = message.splitlines(keepends=True)
 
@@ -84,8 +108,9 @@ class DualLogger:
                 pass
 
     def flush(self):
-        self.terminal.flush()
-        self.log.flush()
+        with self._lock:
+            self.terminal.flush()
+            self.log.flush()
 
 def parse_price(price_str):
     """Converte string de preço (ex: 'R$ 1.200,50') para float."""
@@ -105,6 +130,303 @@ def parse_price(price_str):
     except (ValueError, IndexError):
         return None
 
+def category_name(url):
+    """Extrai um nome legível da categoria a partir da URL do Magazine Luiza."""
+    try:
+        parts = [p for p in url.split('/') if p]
+        category_slug = parts[-1] if parts[-1] != 'l' else parts[-2]
+        return category_slug.replace('-', ' ').title()
+    except Exception:
+        return "Ofertas"
+
+# Variável de prazo (segundos) de cada scraper; sem ela vale SCRAPER_TIMEOUT_SECONDS
+SCRAPER_TIMEOUT_ENV = {
+    "MagazineLuizaScraper": "MAGAZINE_LUIZA_TIMEOUT",
+    "MagazineLuizaCategoriesScraper": "MAGAZINE_LUIZA_TIMEOUT",
+    "MercadoLivreScraper": "MERCADO_LIVRE_TIMEOUT",
+    "ShopeeScraper": "SHOPEE_TIMEOUT",
+}
+
+def scraper_timeout(scraper):
+    """Prazo do scraper no ciclo, em segundos."""
+    default = os.getenv("SCRAPER_TIMEOUT_SECONDS", 600)
+    try:
+        return float(os.getenv(SCRAPER_TIMEOUT_ENV.get(scraper.__class__.__name__, ""), default))
+    except (ValueError, TypeError):
+        return 600.0
+
+def stream_scrapers(scrapers, notify_error):
+    """
+    Executa os scrapers ao mesmo tempo, cada um em sua thread e com seu próprio
+    prazo, e entrega as ofertas conforme chegam (via iter_deals()). Um scraper
+    que estoura o prazo é cancelado (cancel()) e o que ele ainda produzir é
+    descartado, sem segurar os demais. O close() de cada scraper é sempre
+    chamado. Ofertas do mesmo produto vindas de fontes diferentes são aceitas
+    uma única vez (chave canônica do produto).
+    """
+    fila = queue.Queue()
+    finished = object()
+
+    def run(scraper):
+        name = scraper.__class__.__name__
+        try:
+            for oferta in scraper.iter_deals():
+                if scraper.is_cancelled():
+                    break
+                fila.put((scraper, oferta))
+        except Exception as e:
+            if not scraper.is_cancelled():
+                print(f"   !!! Erro inesperado ao executar o scraper {name}: {e}")
+                notify_error(e, f"Execução do scraper {name}")
+        finally:
+            try:
+                scraper.close()
+            finally:
+                # A thread é descartada no fim do ciclo: a conexão com o banco volta ao pool
+                release_connection()
+                # Marca o fim antes de enfileirar: ofertas ainda na fila (o consumidor
+                # pode estar postando) não fazem o scraper parecer atrasado
+                done[scraper].set()
+                fila.put((scraper, finished))
+
+    done = {scraper: threading.Event() for scraper in scrapers}
+    executor = ThreadPoolExecutor(max_workers=len(scrapers), thread_name_prefix="scraper")
+    started = time.monotonic()
+    deadlines = {}
+    counts = {}
+    for scraper in scrapers:
+        print(f"\n--- Executando {scraper.__class__.__name__} ---")
+        deadlines[scraper] = started + scraper_timeout(scraper)
+        counts[scraper] = 0
+        executor.submit(run, scraper)
+
+    active = set(scrapers)
+    seen_keys = set()
+    try:
+        while active:
+            running = [s for s in active if not done[s].is_set()]
+            timeout = max(min(deadlines[s] for s in running) - time.monotonic(), 0) if running else None
+            try:
+                scraper, item = fila.get(timeout=timeout)
+            except queue.Empty:
+                scraper, item = None, None
+
+            if scraper in active and item is finished:
+                active.discard(scraper)
+                name = scraper.__class__.__name__
+                if counts[scraper]:
+                    print(f"   >>> {counts[scraper]} ofertas encontradas por {name} ({time.monotonic() - started:.0f}s).")
+                else:
+                    print(f"   >>> Nenhuma oferta encontrada por {name}.")
+            elif scraper in active and item is not None:
+                key = deal_key(item.get('link_original') or item.get('link'))
+                if key is not None and key in seen_keys:
+                    print(f"   [Ignorando] '{item['titulo'][:30]}...' já foi coletada por outro scraper neste ciclo.")
+                else:
+                    seen_keys.add(key)
+                    counts[scraper] += 1
+                    yield item
+
+            # Cancela os scrapers ainda em execução que passaram do prazo e segue com os demais
+            now = time.monotonic()
+            for scraper in [s for s in active if deadlines[s] <= now and not done[s].is_set()]:
+                name = scraper.__class__.__name__
+                print(f"   !!! {name} excedeu o prazo de {scraper_timeout(scraper):.0f}s. Cancelando...")
+                active.discard(scraper)
+                try:
+                    scraper.cancel()
+                except Exception as e:
+                    print(f"   !!! Erro ao cancelar {name}: {e}")
+                try:
+                    scraper.close()
+                except Exception as e:
+                    print(f"   !!! Erro ao fechar {name}: {e}")
+                notify_error(
+                    TimeoutError(f"{name} excedeu o prazo de {scraper_timeout(scraper):.0f}s"),
+                    f"Execução do scraper {name}",
+                    details=f"{name} foi cancelado após {time.monotonic() - started:.0f}s com {counts[scraper]} ofertas coletadas.",
+                )
+    finally:
+        # Se o consumidor parar antes do fim, os scrapers restantes são cancelados
+        for scraper in active:
+            scraper.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def run_scrapers(scrapers, notify_error):
+    """
+    Coleta completa do ciclo (ver stream_scrapers).
+
+    Returns:
+        list: Ofertas coletadas no ciclo.
+    """
+    return list(stream_scrapers(scrapers, notify_error))
+
+def filter_deals(ofertas, min_price=0.0, min_price_drop=0.0, price_history_days=30, cycle_started=None):
+    """
+    Descarta as ofertas que já foram postadas ou não passam nos filtros de
+    preço mínimo e de queda de preço. Os preços já foram gravados no histórico
+    pelos scrapers; 'cycle_started' deixa as observações deste ciclo fora da mediana.
+
+    Returns:
+        list: Ofertas aprovadas, na ordem recebida.
+    """
+    annotate_price_drops(ofertas, days=price_history_days, before=cycle_started)
+
+    aprovadas = []
+    # A deduplicação usa o link original do produto (o link final pode ser de afiliado)
+    links_existentes = deals_exist_many(oferta.get('link_original') or oferta['link'] for oferta in ofertas)
+    for oferta in ofertas:
+        # Verifica duplicatas
+        if (oferta.get('link_original') or oferta['link']) in links_existentes:
+            print(f"   [Ignorando] A oferta '{oferta['titulo'][:30]}...' já foi postada.")
+            continue
+
+        # Verifica preço mínimo (se configurado)
+        if min_price > 0:
+            price_val = parse_price(oferta.get('preco'))
+            if price_val is not None and price_val < min_price:
+                print(f"   [Ignorando] Preço (R$ {price_val:.2f}) abaixo do mínimo (R$ {min_price:.2f}): {oferta['titulo'][:30]}...")
+                continue
+
+        # Verifica a queda de preço vs. a mediana do histórico (se configurado)
+        if min_price_drop > 0 and oferta.get('queda_mediana') is not None and oferta['queda_mediana'] < min_price_drop:
+            print(f"   [Ignorando] Queda de {oferta['queda_mediana']}% vs. mediana de {price_history_days} dias abaixo de {min_price_drop}%: {oferta['titulo'][:30]}...")
+            continue
+
+        aprovadas.append(oferta)
+    return aprovadas
+
+def build_posters():
+    """
+    Monta os posters ativados no .env.
+
+    Returns:
+        tuple: (lista de posters, se o modo de revisão está ativo).
+    """
+    posters = []
+    if os.getenv("POST_TO_WHATSAPP", "false").lower() == "true":
+        # Lógica para alternar entre ambiente de Produção e Teste
+        target_chat_id = os.getenv("WHATSAPP_CHAT_ID")
+        app_env = os.getenv("APP_ENV", "production").lower()
+
+        if app_env == "test":
+            test_chat_id = os.getenv("WHATSAPP_CHAT_ID_TEST")
+            if test_chat_id:
+                print(f">>> [Ambiente de Teste] Redirecionando mensagens para: {test_chat_id}")
+                target_chat_id = test_chat_id
+            else:
+                print(">>> [Aviso] Ambiente de teste configurado, mas WHATSAPP_CHAT_ID_TEST não definido. Usando produção.")
+
+        if all([os.getenv("EVOLUTION_API_URL"), os.getenv("EVOLUTION_API_KEY"), os.getenv("EVOLUTION_INSTANCE_NAME"), target_chat_id]):
+            posters.append(WhatsappPoster(
+                api_url=os.getenv("EVOLUTION_API_URL"),
+                api_key=os.getenv("EVOLUTION_API_KEY"),
+                instance_name=os.getenv("EVOLUTION_INSTANCE_NAME"),
+                chat_id=target_chat_id
+            ))
+        else:
+            print("\n>>> AVISO: Postagem no WhatsApp ativada, mas as configurações da API estão incompletas no .env.")
+
+    if os.getenv("POST_TO_INSTAGRAM", "false").lower() == "true":
+        ig_token = os.getenv("INSTAGRAM_ACCESS_TOKEN")
+        ig_account = os.getenv("INSTAGRAM_ACCOUNT_ID")
+
+        if ig_token and ig_account:
+            posters.append(InstagramPoster(
+                access_token=ig_token,
+                account_id=ig_account
+            ))
+        else:
+            print("\n>>> AVISO: Postagem no Instagram ativada, mas credenciais (TOKEN/ACCOUNT_ID) incompletas no .env.")
+
+    if os.getenv("POST_TO_FACEBOOK", "false").lower() == "true":
+        fb_token = os.getenv("FACEBOOK_ACCESS_TOKEN")
+        fb_page = os.getenv("FACEBOOK_PAGE_ID")
+
+        if fb_token and fb_page:
+            posters.append(FacebookPoster(
+                access_token=fb_token,
+                page_id=fb_page
+            ))
+        else:
+            print("\n>>> AVISO: Postagem no Facebook ativada, mas credenciais (TOKEN/PAGE_ID) incompletas no .env.")
+
+    # --- Review Mode (Sobrescreve posters se ativado) ---
+    is_review_mode = os.getenv("REVIEW_MODE", "false").lower() == "true"
+    review_group_id = os.getenv("WHATSAPP_REVIEW_GROUP_ID")
+
+    if is_review_mode and review_group_id:
+        print(f"\n>>> [REVIEW MODE] Ativado! Redirecionando TUDO para o grupo de revisão: {review_group_id}")
+        # Substitui todos os posters por um único poster de WhatsApp voltado para o grupo de revisão
+        posters = [WhatsappPoster(
+            api_url=os.getenv("EVOLUTION_API_URL"),
+            api_key=os.getenv("EVOLUTION_API_KEY"),
+            instance_name=os.getenv("EVOLUTION_INSTANCE_NAME"),
+            chat_id=review_group_id
+        )]
+
+    return posters, is_review_mode
+
+def send_coupon_message(posters):
+    """Envia a mensagem de cupons da Magazine Luiza (uma vez por ciclo, antes das ofertas)."""
+    coupon_url = os.getenv("MAGAZINE_LUIZA_COUPONS_URL", "https://especiais.magazineluiza.com.br/magazinevoce/cupons/?showcase=magazineachadostecbr")
+    msg_cupons = (
+        "Vai comprar no Magazine Luiza?\n"
+        "🔥 Não perca nenhum desconto na sua compra.\n"
+        "🛒 Acesse o link abaixo e veja a lista de cupons disponíveis:\n"
+        f"{coupon_url}"
+    )
+
+    print(f"\n>>> Enviando mensagem de cupons para {len(posters)} plataforma(s)...")
+    for poster in posters:
+        try:
+            # Envia principalmente no WhatsApp que aceita texto puro
+            if hasattr(poster, 'send_text'):
+                poster.send_text(msg_cupons)
+        except Exception as e:
+            print(f"   !!! Erro ao enviar mensagem de cupons com {poster.__class__.__name__}: {e}")
+
+def post_deal(produto, posters, is_review_mode, notify_error):
+    """Publica uma oferta em todas as plataformas e a registra para não ser postada novamente."""
+    for poster in posters:
+        try:
+            poster.post_deal(produto)
+
+            # Se estiver em modo de revisão, também gera e envia a imagem de STORY para o grupo
+            if is_review_mode and isinstance(poster, WhatsappPoster):
+                print("   [Review Mode] Aguardando para enviar imagem de Story...")
+                time.sleep(3) # Delay para evitar 429 da API
+
+                print("   [Review Mode] Gerando imagem de Story para revisão...")
+                story_path = ImageGenerator.generate(produto, mode="story")
+                if story_path and os.path.exists(story_path):
+                    review_deal = produto.copy()
+                    # Agora o WhatsappPoster aceita caminho local
+                    review_deal['imagem'] = story_path
+                    review_deal['titulo'] = f"📸 {produto['titulo']}"
+                    review_deal['is_story_review'] = True
+
+                    story_review_group = os.getenv("WHATSAPP_STORY_REVIEW_GROUP_ID")
+                    if story_review_group:
+                        print(f"   [Review Mode] Enviando Story para o grupo específico: {story_review_group}")
+                        story_poster = WhatsappPoster(
+                            api_url=poster.api_url,
+                            api_key=poster.api_key,
+                            instance_name=poster.instance_name,
+                            chat_id=story_review_group
+                        )
+                        story_poster.post_deal(review_deal)
+                    else:
+                        poster.post_deal(review_deal)
+        except Exception as e:
+            print(f"   !!! Erro ao postar com {poster.__class__.__name__}: {e}")
+            traceback.print_exc()
+            notify_error(e, f"Postagem com {poster.__class__.__name__}")
+
+    # Adiciona a oferta ao banco de dados para não ser postada novamente
+    queue_deal(produto['link'], produto['titulo'], produto.get('link_original'))
+    print(f"   [Registrado] Oferta '{produto['titulo'][:30]}...' registrada para gravação no banco de dados.")
+
 def main():
     """
     Orquestrador principal da aplicação.
@@ -113,6 +435,27 @@ def main():
     
     # Inicializa o banco de dados
     init_db()
+    init_price_history()
+    init_affiliate_cache()
+    init_shopee_reservoir()
+    init_keyword_stats()
+    init_feed_cursors()
+
+    # Registros das ofertas postadas são gravados em lote (write-behind)
+    configure_write_buffer(
+        batch_size=os.getenv("DB_WRITE_BATCH_SIZE"),
+        flush_seconds=os.getenv("DB_WRITE_FLUSH_SECONDS")
+    )
+
+    def handle_shutdown(signum, frame):
+        print(f"\n>>> Sinal {signum} recebido. Gravando ofertas pendentes e encerrando...")
+        flush_pending()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+
+    # Expira ofertas antigas (mais de 48 horas) em segundo plano para permitir repostagem
+    start_expiry_worker(hours=48, interval=int(os.getenv("DB_EXPIRY_INTERVAL_SECONDS", 300)))
     
     print(">>> Iniciando execução em loop (Intervalo: 20-35 min).")
 
@@ -127,11 +470,19 @@ def main():
             chat_id=error_group_id
         )
 
-    def notify_error(e, context=""):
+    def notify_error(e, context="", details=None):
+        """
+        Envia um alerta de erro para o WhatsApp.
+
+        Args:
+            details: Texto exibido no lugar do traceback. Obrigatório fora de um
+                bloco except, onde traceback.format_exc() não tem o que mostrar.
+        """
         if error_poster:
             try:
-                tb = traceback.format_exc()
-                msg = f"🚨 *ERRO NO OFFER FLOW* 🚨\n\n*Contexto:* {context}\n*Erro:* {str(e)}\n\n*Traceback:*\n```{tb[:3000]}```"
+                if details is None:
+                    details = traceback.format_exc() if sys.exc_info()[0] else "(sem traceback)"
+                msg = f"🚨 *ERRO NO OFFER FLOW* 🚨\n\n*Contexto:* {context}\n*Erro:* {str(e)}\n\n*Detalhes:*\n```{details[:3000]}```"
                 error_poster.send_text(msg)
             except Exception as ex:
                 print(f"   !!! Falha ao enviar alerta para WhatsApp (Verifique se a API está rodando): {ex}")
@@ -182,9 +533,6 @@ def main():
                 notify_error(e, "Configuração de Horário")
 
         print(f"\n>>> Iniciando novo ciclo em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-        # Limpa ofertas antigas (mais de 48 horas) para permitir repostagem
-        clean_old_deals(48)
-
         # Define a quantidade limite padrão de produtos (pode ser sobrescrito por scraper)
         default_limit = int(os.getenv("DEFAULT_PRODUCTS_LIMIT", 2))
 
@@ -197,31 +545,39 @@ def main():
             except ValueError:
                 print(f">>> AVISO: MIN_PRICE_TO_POST inválido no .env ('{min_price_env}'). Desativando filtro de preço mínimo.")
 
+        # Histórico de preços: janela (dias) e queda mínima vs. mediana para postar (0 = sem filtro)
+        price_history_days = int(os.getenv("PRICE_HISTORY_DAYS", 30))
+        try:
+            min_price_drop = float(str(os.getenv("PRICE_DROP_MIN_PERCENT", "0")).replace(",", "."))
+        except ValueError:
+            min_price_drop = 0.0
+
         # --- Configurações dos Scrapers ---
         scrapers = []
         
-        # Magazine Luiza com Rotação de URL
-        current_magalu_url = magalu_urls[magalu_idx]
-        
-        # Extração de nome de categoria mais robusta
-        try:
-            parts = [p for p in current_magalu_url.split('/') if p]
-            category_slug = parts[-1] if parts[-1] != 'l' else parts[-2]
-            category_name = category_slug.replace('-', ' ').title()
-        except Exception:
-            category_name = "Ofertas"
-            
-        print(f">>> [Magalu] Ciclo atual focado em: {category_name}")
-        
         limit = int(os.getenv("MAGAZINE_LUIZA_LIMIT", default_limit))
-        scrapers.append(MagazineLuizaScraper(
-            url=current_magalu_url,
-            session_path=os.path.join(os.getcwd(), "sessao_chrome"),
-            limit=limit
-        ))
-        
-        # Rotaciona o índice para o próximo ciclo
-        magalu_idx = (magalu_idx + 1) % len(magalu_urls)
+        magalu_session_path = os.path.join(os.getcwd(), "sessao_chrome")
+        if magalu_urls and os.getenv("MAGAZINE_LUIZA_CATEGORIES", "rotate").lower() == "all":
+            # Todas as categorias no mesmo ciclo, em paralelo, com cota por categoria
+            print(f">>> [Magalu] Ciclo atual cobre todas as categorias: {', '.join(category_name(url) for url in magalu_urls)}")
+            scrapers.append(MagazineLuizaCategoriesScraper(
+                urls=magalu_urls,
+                session_path=magalu_session_path,
+                limit=limit
+            ))
+        elif magalu_urls:
+            # Magazine Luiza com Rotação de URL
+            current_magalu_url = magalu_urls[magalu_idx]
+            print(f">>> [Magalu] Ciclo atual focado em: {category_name(current_magalu_url)}")
+
+            scrapers.append(MagazineLuizaScraper(
+                url=current_magalu_url,
+                session_path=magalu_session_path,
+                limit=limit
+            ))
+
+            # Rotaciona o índice para o próximo ciclo
+            magalu_idx = (magalu_idx + 1) % len(magalu_urls)
 
         if os.getenv("MERCADO_LIVRE_URL"):
             limit = int(os.getenv("MERCADO_LIVRE_LIMIT", default_limit))
@@ -231,186 +587,96 @@ def main():
             scrapers.append(ShopeeScraper(limit=limit))
 
         # --- Coleta de Ofertas ---
-        todas_as_ofertas = []
         if not scrapers:
             print(">>> ERRO: Nenhum scraper foi ativado. Verifique as URLs no arquivo .env.")
             # Aguarda um pouco antes de tentar novamente para não travar o loop em erro rápido
             time.sleep(60)
             continue
             
-        print(f">>> Iniciando automação com {len(scrapers)} scraper(s)...")
-        for scraper in scrapers:
+        print(f">>> Iniciando automação com {len(scrapers)} scraper(s) em paralelo...")
+        posters, is_review_mode = build_posters()
+        cycle_started = time.time()
+
+        if os.getenv("STREAM_POSTING", "false").lower() == "true":
+            # --- Coleta e Postagem em Fluxo ---
+            # As ofertas são postadas enquanto os demais scrapers continuam
+            # coletando em segundo plano. Elas chegam em lotes de até
+            # STREAM_BUFFER_SIZE: cada lote é filtrado de uma vez e postado
+            # a partir da maior queda de preço
             try:
-                print(f"\n--- Executando {scraper.__class__.__name__} ---")
-                
-                novas_ofertas = scraper.fetch_deals()
-                if novas_ofertas:
-                    todas_as_ofertas.extend(novas_ofertas)
-                    print(f"   >>> {len(novas_ofertas)} ofertas encontradas por este scraper.")
-                else:
-                    print("   >>> Nenhuma oferta encontrada por este scraper.")
-            except Exception as e:
-                print(f"   !!! Erro inesperado ao executar o scraper {scraper.__class__.__name__}: {e}")
-                notify_error(e, f"Execução do scraper {scraper.__class__.__name__}")
-            finally:
-                scraper.close()
-
-        # --- Filtragem de Ofertas Duplicadas ---
-        if not todas_as_ofertas:
-            print("\n>>> Nenhum produto foi coletado no total.")
-        else:
-            print(f"\n>>> {len(todas_as_ofertas)} ofertas coletadas no total. Verificando duplicatas no banco de dados...")
-            ofertas_para_postar = []
-            for oferta in todas_as_ofertas:
-                # Verifica duplicatas
-                if deal_exists(oferta['link']):
-                    print(f"   [Ignorando] A oferta '{oferta['titulo'][:30]}...' já foi postada.")
-                    continue
-
-                # Verifica preço mínimo (se configurado)
-                if min_price > 0:
-                    price_val = parse_price(oferta.get('preco'))
-                    if price_val is not None and price_val < min_price:
-                        print(f"   [Ignorando] Preço (R$ {price_val:.2f}) abaixo do mínimo (R$ {min_price:.2f}): {oferta['titulo'][:30]}...")
+                buffer_size = max(int(os.getenv("STREAM_BUFFER_SIZE", 10)), 1)
+            except ValueError:
+                buffer_size = 10
+            coletadas = 0
+            postadas = 0
+            lote = []
+            ofertas = iter(stream_scrapers(scrapers, notify_error))
+            fim = object()
+            while True:
+                oferta = next(ofertas, fim)
+                if oferta is not fim:
+                    coletadas += 1
+                    lote.append(oferta)
+                    if len(lote) < buffer_size:
                         continue
+                if lote:
+                    aprovadas = filter_deals(lote, min_price, min_price_drop, price_history_days, cycle_started)
+                    aprovadas.sort(key=lambda o: o.get('queda_mediana') or 0, reverse=True)
+                    lote = []
+                    for produto in aprovadas:
+                        if not posters:
+                            break
+                        if postadas == 0:
+                            send_coupon_message(posters)
+                        else:
+                            print("\n   ...aguardando para postar o próximo produto...")
+                            time.sleep(10)
+                        postadas += 1
+                        print(f"\n-- Postando Oferta {postadas}: {produto['titulo'][:40]}... --")
+                        post_deal(produto, posters, is_review_mode, notify_error)
+                if oferta is fim:
+                    break
+
+            if not coletadas:
+                print("\n>>> Nenhum produto foi coletado no total.")
+            elif not posters:
+                print("\n>>> Nenhuma plataforma de postagem foi ativada. As ofertas não serão enviadas.")
+            elif not postadas:
+                print("\n>>> Nenhuma oferta NOVA para postar.")
+            else:
+                print(f"\n>>> {postadas} de {coletadas} ofertas coletadas foram postadas em {len(posters)} plataforma(s).")
+        else:
+            todas_as_ofertas = run_scrapers(scrapers, notify_error)
 
-                ofertas_para_postar.append(oferta)
-            
-            # --- Configuração dos Posters ---
-            posters = []
-            # (O código para popular a lista 'posters' permanece o mesmo)
-            if os.getenv("POST_TO_WHATSAPP", "false").lower() == "true":
-                # Lógica para alternar entre ambiente de Produção e Teste
-                target_chat_id = os.getenv("WHATSAPP_CHAT_ID")
-                app_env = os.getenv("APP_ENV", "production").lower()
-
-                if app_env == "test":
-                    test_chat_id = os.getenv("WHATSAPP_CHAT_ID_TEST")
-                    if test_chat_id:
-                        print(f">>> [Ambiente de Teste] Redirecionando mensagens para: {test_chat_id}")
-                        target_chat_id = test_chat_id
-                    else:
-                        print(">>> [Aviso] Ambiente de teste configurado, mas WHATSAPP_CHAT_ID_TEST não definido. Usando produção.")
-
-                if all([os.getenv("EVOLUTION_API_URL"), os.getenv("EVOLUTION_API_KEY"), os.getenv("EVOLUTION_INSTANCE_NAME"), target_chat_id]):
-                    posters.append(WhatsappPoster(
-                        api_url=os.getenv("EVOLUTION_API_URL"),
-                        api_key=os.getenv("EVOLUTION_API_KEY"),
-                        instance_name=os.getenv("EVOLUTION_INSTANCE_NAME"),
-                        chat_id=target_chat_id
-                    ))
-                else:
-                    print("\n>>> AVISO: Postagem no WhatsApp ativada, mas as configurações da API estão incompletas no .env.")
+            # --- Filtragem de Ofertas Duplicadas ---
+            if not todas_as_ofertas:
+                print("\n>>> Nenhum produto foi coletado no total.")
+            else:
+                print(f"\n>>> {len(todas_as_ofertas)} ofertas coletadas no total. Verificando duplicatas no banco de dados...")
+                ofertas_para_postar = filter_deals(todas_as_ofertas, min_price, min_price_drop, price_history_days, cycle_started)
 
-            if os.getenv("POST_TO_INSTAGRAM", "false").lower() == "true":
-                ig_token = os.getenv("INSTAGRAM_ACCESS_TOKEN")
-                ig_account = os.getenv("INSTAGRAM_ACCOUNT_ID")
-                
-                if ig_token and ig_account:
-                    posters.append(InstagramPoster(
-                        access_token=ig_token,
-                        account_id=ig_account
-                    ))
-                else:
-                    print("\n>>> AVISO: Postagem no Instagram ativada, mas credenciais (TOKEN/ACCOUNT_ID) incompletas no .env.")
-            
-            if os.getenv("POST_TO_FACEBOOK", "false").lower() == "true":
-                fb_token = os.getenv("FACEBOOK_ACCESS_TOKEN")
-                fb_page = os.getenv("FACEBOOK_PAGE_ID")
-                
-                if fb_token and fb_page:
-                    posters.append(FacebookPoster(
-                        access_token=fb_token,
-                        page_id=fb_page
-                    ))
+                # Prioriza as ofertas com maior queda de preço em relação ao histórico
+                ofertas_para_postar.sort(key=lambda o: o.get('queda_mediana') or 0, reverse=True)
+
+                # --- Envio das Ofertas Novas ---
+                if not ofertas_para_postar:
+                    print("\n>>> Nenhuma oferta NOVA para postar.")
+                elif not posters:
+                    print("\n>>> Nenhuma plataforma de postagem foi ativada. As ofertas não serão enviadas.")
                 else:
-                    print("\n>>> AVISO: Postagem no Facebook ativada, mas credenciais (TOKEN/PAGE_ID) incompletas no .env.")
+                    send_coupon_message(posters)
 
-            # --- Review Mode (Sobrescreve posters se ativado) ---
-            is_review_mode = os.getenv("REVIEW_MODE", "false").lower() == "true"
-            review_group_id = os.getenv("WHATSAPP_REVIEW_GROUP_ID")
-            
-            if is_review_mode and review_group_id:
-                print(f"\n>>> [REVIEW MODE] Ativado! Redirecionando TUDO para o grupo de revisão: {review_group_id}")
-                # Substitui todos os posters por um único poster de WhatsApp voltado para o grupo de revisão
-                posters = [WhatsappPoster(
-                    api_url=os.getenv("EVOLUTION_API_URL"),
-                    api_key=os.getenv("EVOLUTION_API_KEY"),
-                    instance_name=os.getenv("EVOLUTION_INSTANCE_NAME"),
-                    chat_id=review_group_id
-                )]
-
-            # --- Envio das Ofertas Novas ---
-            if not ofertas_para_postar:
-                print("\n>>> Nenhuma oferta NOVA para postar.")
-            elif not posters:
-                print("\n>>> Nenhuma plataforma de postagem foi ativada. As ofertas não serão enviadas.")
-            else:
-                # --- Mensagem de Cupons (Uma vez por ciclo antes das ofertas) ---
-                coupon_url = os.getenv("MAGAZINE_LUIZA_COUPONS_URL", "https://especiais.magazineluiza.com.br/magazinevoce/cupons/?showcase=magazineachadostecbr")
-                msg_cupons = (
-                    "Vai comprar no Magazine Luiza?\n"
-                    "🔥 Não perca nenhum desconto na sua compra.\n"
-                    "🛒 Acesse o link abaixo e veja a lista de cupons disponíveis:\n"
-                    f"{coupon_url}"
-                )
-                
-                print(f"\n>>> Enviando mensagem de cupons para {len(posters)} plataforma(s)...")
-                for poster in posters:
-                    try:
-                        # Envia principalmente no WhatsApp que aceita texto puro
-                        if hasattr(poster, 'send_text'):
-                            poster.send_text(msg_cupons)
-                    except Exception as e:
-                        print(f"   !!! Erro ao enviar mensagem de cupons com {poster.__class__.__name__}: {e}")
-
-                print(f"\n>>> {len(ofertas_para_postar)} novas ofertas para postar em {len(posters)} plataforma(s)...")
-                for i, produto in enumerate(ofertas_para_postar):
-                    print(f"\n-- Postando Oferta {i+1}/{len(ofertas_para_postar)}: {produto['titulo'][:40]}... --")
-                    
-                    for poster in posters:
-                        try:
-                            poster.post_deal(produto)
-                            
-                            # Se estiver em modo de revisão, também gera e envia a imagem de STORY para o grupo
-                            if is_review_mode and isinstance(poster, WhatsappPoster):
-                                print("   [Review Mode] Aguardando para enviar imagem de Story...")
-                                time.sleep(3) # Delay para evitar 429 da API
-                                
-                                print("   [Review Mode] Gerando imagem de Story para revisão...")
-                                story_path = ImageGenerator.generate(produto, mode="story")
-                                if story_path and os.path.exists(story_path):
-                                    review_deal = produto.copy()
-                                    # Agora o WhatsappPoster aceita caminho local
-                                    review_deal['imagem'] = story_path
-                                    review_deal['titulo'] = f"📸 {produto['titulo']}"
-                                    review_deal['is_story_review'] = True
-                                    
-                                    story_review_group = os.getenv("WHATSAPP_STORY_REVIEW_GROUP_ID")
-                                    if story_review_group:
-                                        print(f"   [Review Mode] Enviando Story para o grupo específico: {story_review_group}")
-                                        story_poster = WhatsappPoster(
-                                            api_url=poster.api_url,
-                                            api_key=poster.api_key,
-                                            instance_name=poster.instance_name,
-                                            chat_id=story_review_group
-                                        )
-                                        story_poster.post_deal(review_deal)
-                                    else:
-                                        poster.post_deal(review_deal)
-                        except Exception as e:
-                            print(f"   !!! Erro ao postar com {poster.__class__.__name__}: {e}")
-                            traceback.print_exc()
-                            notify_error(e, f"Postagem com {poster.__class__.__name__}")
-                    
-                    # Adiciona a oferta ao banco de dados para não ser postada novamente
-                    add_deal(produto['link'], produto['titulo'])
-                    print(f"   [Registrado] Oferta '{produto['titulo'][:30]}...' salva no banco de dados.")
+                    print(f"\n>>> {len(ofertas_para_postar)} novas ofertas para postar em {len(posters)} plataforma(s)...")
+                    for i, produto in enumerate(ofertas_para_postar):
+                        print(f"\n-- Postando Oferta {i+1}/{len(ofertas_para_postar)}: {produto['titulo'][:40]}... --")
+                        post_deal(produto, posters, is_review_mode, notify_error)
 
-                    if i < len(ofertas_para_postar) - 1:
-                        print("\n   ...aguardando para postar o próximo produto...")
-                        time.sleep(10)
+                        if i < len(ofertas_para_postar) - 1:
+                            print("\n   ...aguardando para postar o próximo produto...")
+                            time.sleep(10)
 
+        # Grava os registros pendentes antes da espera entre ciclos
+        flush_pending()
         print("\n>>> Ciclo finalizado.")
         intervalo = random.randint(20, 40)
         proxima_execucao = datetime.now() + timedelta(minutes=intervalo)
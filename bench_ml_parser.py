@@ -0,0 +1,98 @@
+"""
+Benchmark do parser da pagina de ofertas do Mercado Livre.
+
+Compara o parser antigo (arvore completa com html.parser + find_all) com o
+parser atual (fatias por card + SoupStrainer + parada antecipada) sobre
+paginas HTML salvas em disco.
+
+Uso:
+    python bench_ml_parser.py --fetch 3            # baixa 3 paginas para bench_pages/
+    python bench_ml_parser.py bench_pages/*.html   # roda o benchmark
+    python bench_ml_parser.py --limit 5 --repeat 10 bench_pages/*.html
+"""
+import os
+import sys
+import time
+import argparse
+from bs4 import BeautifulSoup
+
+from scrapers.mercado_livre import MercadoLivreScraper, HTML_PARSER
+
+PAGES_DIR = "bench_pages"
+
+def fetch_pages(count):
+    from utils.http import get_session
+    scraper = MercadoLivreScraper(limit=1)
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    paths = []
+    for page in range(1, count + 1):
+        url = f"https://www.mercadolivre.com.br/ofertas?page={page}"
+        print(f"Baixando {url}...")
+        resp = get_session().get(url, headers=scraper.headers, timeout=15)
+        resp.raise_for_status()
+        path = os.path.join(PAGES_DIR, f"ofertas_{page}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(resp.text)
+        paths.append(path)
+    return paths
+
+def legacy_parse(scraper, html, limit):
+    """Reproduz o caminho antigo: arvore inteira da pagina e find_all em todos os cards."""
+    soup = BeautifulSoup(html, "html.parser")
+    produtos = []
+    for card in soup.find_all(class_="poly-card"):
+        if len(produtos) >= limit:
+            break
+        link_elem = card.find("a", class_="poly-component__title")
+        if not link_elem or not link_elem.get("href"):
+            continue
+        produto = scraper._parse_card(card, link_elem, scraper._normalize_link(link_elem["href"]))
+        if produto:
+            produtos.append(produto)
+    return produtos
+
+def timed(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do parser do Mercado Livre")
+    parser.add_argument("pages", nargs="*", help="Arquivos HTML salvos da pagina de ofertas")
+    parser.add_argument("--fetch", type=int, default=0, help="Baixa N paginas de ofertas para bench_pages/")
+    parser.add_argument("--limit", type=int, default=5, help="Quantidade de ofertas por pagina")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticoes (usa o melhor tempo)")
+    args = parser.parse_args()
+
+    pages = list(args.pages)
+    if args.fetch:
+        pages.extend(fetch_pages(args.fetch))
+    if not pages:
+        parser.print_help()
+        sys.exit(1)
+
+    scraper = MercadoLivreScraper(limit=args.limit)
+    no_duplicates = lambda links: set()
+    no_history = lambda observations: 0
+    print(f"Parser atual: {HTML_PARSER} | limite: {args.limit} | repeticoes: {args.repeat}\n")
+
+    total_old = total_new = 0.0
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        old_time, old_result = timed(lambda: legacy_parse(scraper, html, args.limit), args.repeat)
+        new_time, new_result = timed(lambda: scraper.parse_listing(html, args.limit, no_duplicates, no_history), args.repeat)
+        total_old += old_time
+        total_new += new_time
+        same = [p["link"] for p in old_result] == [p["link"] for p in new_result]
+        print(f"{os.path.basename(path)}: antigo {old_time * 1000:.1f} ms | novo {new_time * 1000:.1f} ms "
+              f"| {old_time / new_time:.1f}x | {len(new_result)} ofertas | resultados iguais: {same}")
+
+    print(f"\nTotal: antigo {total_old * 1000:.1f} ms | novo {total_new * 1000:.1f} ms | {total_old / total_new:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import time
+import sqlite3
+
+from database.database import get_connection, MAX_SQL_VARIABLES
+from database.canonical import deal_key
+
+def init_affiliate_cache():
+    """
+    Cria a tabela de cache de links de afiliado.
+    A chave é (produto canônico, tag de afiliado), então o mesmo produto
+    encontrado em outro link ou em outro ciclo reaproveita o link já gerado.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS affiliate_links (
+                    key_hash INTEGER NOT NULL,
+                    tag TEXT NOT NULL,
+                    affiliate_link TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    PRIMARY KEY (key_hash, tag)
+                ) WITHOUT ROWID
+            """)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao inicializar o cache de links de afiliado: {e}")
+
+def get_cached_affiliate_links(source_links, tag, ttl_hours=72):
+    """
+    Busca, em uma única consulta, os links de afiliado ainda válidos.
+
+    Returns:
+        dict: link original -> link de afiliado (apenas os encontrados no cache).
+    """
+    links_by_key = {}
+    for link in source_links:
+        key = deal_key(link)
+        if key is not None:
+            links_by_key.setdefault(key, []).append(link)
+    cached = {}
+    if not links_by_key:
+        return cached
+    since = int(time.time() - ttl_hours * 3600)
+    keys = list(links_by_key)
+    try:
+        conn = get_connection()
+        for start in range(0, len(keys), MAX_SQL_VARIABLES):
+            chunk = keys[start:start + MAX_SQL_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(
+                f"SELECT key_hash, affiliate_link FROM affiliate_links "
+                f"WHERE tag = ? AND created_at >= ? AND key_hash IN ({placeholders})",
+                [tag, since] + chunk
+            )
+            for key, affiliate_link in cursor:
+                for link in links_by_key[key]:
+                    cached[link] = affiliate_link
+    except sqlite3.Error as e:
+        print(f">>> Erro ao consultar o cache de links de afiliado: {e}")
+    return cached
+
+def save_affiliate_links(pairs, tag):
+    """Grava (link original, link de afiliado) no cache em uma única transação."""
+    now = int(time.time())
+    rows = [(deal_key(source), tag, affiliate, now) for source, affiliate in pairs if source and affiliate]
+    if not rows:
+        return
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO affiliate_links (key_hash, tag, affiliate_link, created_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+    except sqlite3.Error as e:
+        print(f">>> Erro ao gravar o cache de links de afiliado: {e}")
+
+def invalidate_affiliate_links(source_links, tag):
+    """Remove do cache os links dos produtos cuja conversão falhou."""
+    keys = [(deal_key(link), tag) for link in source_links if link]
+    if not keys:
+        return
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany("DELETE FROM affiliate_links WHERE key_hash = ? AND tag = ?", keys)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao invalidar o cache de links de afiliado: {e}")
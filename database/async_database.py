@@ -0,0 +1,61 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import database
+
+class AsyncDealStore:
+    """
+    Fachada assíncrona para o banco de ofertas.
+    Todas as operações rodam em uma única thread dedicada ao banco (com a sua
+    própria conexão WAL), então as chamadas nunca bloqueiam o event loop e
+    mantêm a mesma semântica das funções síncronas de database.database.
+
+    Uso:
+        async with AsyncDealStore() as store:
+            existentes = await store.deal_exists_many(links)
+            await store.add_deals([(link, titulo, link_original)])
+    """
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deals-db")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def init(self):
+        await self._run(database.init_db)
+
+    async def deal_exists(self, deal_link):
+        return await self._run(database.deal_exists, deal_link)
+
+    async def deal_exists_many(self, deal_links):
+        # Materializa o iterável aqui: geradores não devem ser consumidos em outra thread
+        return await self._run(database.deals_exist_many, list(deal_links))
+
+    async def add_deal(self, deal_link, deal_title, source_link=None):
+        await self._run(database.add_deal, deal_link, deal_title, source_link)
+
+    async def add_deals(self, deals):
+        return await self._run(database.add_deals, list(deals))
+
+    async def queue_deal(self, deal_link, deal_title, source_link=None):
+        await self._run(database.queue_deal, deal_link, deal_title, source_link)
+
+    async def flush(self):
+        return await self._run(database.flush_pending)
+
+    async def expire(self, hours=24, batch_size=database.EXPIRY_BATCH_SIZE):
+        return await self._run(database.expire_deals, hours, batch_size)
+
+    async def close(self):
+        """Grava os pendentes, fecha a conexão da thread do banco e encerra o executor."""
+        await self.flush()
+        await self._run(database.close_connection)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
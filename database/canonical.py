@@ -0,0 +1,56 @@
+import re
+import hashlib
+from urllib.parse import urlsplit, unquote
+
+# Mercado Livre: item (MLB-123 / MLB123), produto de catálogo (/p/MLB123) e user product (/up/MLBU123)
+_ML_ITEM_FILTER = re.compile(r'(?:item_id[:=]|wid=)(MLB)-?(\d+)', re.IGNORECASE)
+_ML_ID = re.compile(r'(MLBU|MLB)-?(\d{6,})', re.IGNORECASE)
+
+# Shopee: /product/<shop>/<item> ou "nome-do-produto-i.<shop>.<item>"
+_SHOPEE_PRODUCT = re.compile(r'/product/(\d+)/(\d+)')
+_SHOPEE_SLUG = re.compile(r'-i\.(\d+)\.(\d+)')
+
+# Magazine Luiza / Magazine Você: .../p/<sku>/...
+_MAGALU_SKU = re.compile(r'/p/([0-9a-z]+)(?:/|$)', re.IGNORECASE)
+
+def canonical_key(link):
+    """
+    Retorna a chave canônica do produto a partir do link da oferta.
+    Links diferentes para o mesmo produto (rastreamento, parâmetros, afiliados
+    longos) resultam na mesma chave, por exemplo 'ml:MLB123', 'shopee:1.2' ou
+    'magalu:237146700'. Links sem identificador conhecido (ex: links curtos
+    de afiliado) usam host + caminho sem query string.
+    """
+    if not link:
+        return None
+    link = unquote(link.strip())
+    parts = urlsplit(link)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    if "mercadolivre" in host or "mercadolibre" in host:
+        match = _ML_ITEM_FILTER.search(link) or _ML_ID.search(parts.path)
+        if match:
+            return f"ml:{match.group(1).upper()}{match.group(2)}"
+    elif "shopee" in host and not host.startswith("s."):
+        match = _SHOPEE_PRODUCT.search(parts.path) or _SHOPEE_SLUG.search(parts.path)
+        if match:
+            return f"shopee:{match.group(1)}.{match.group(2)}"
+    elif "magazineluiza" in host or "magazinevoce" in host:
+        match = _MAGALU_SKU.search(parts.path)
+        if match:
+            return f"magalu:{match.group(1).lower()}"
+
+    path = parts.path.rstrip("/")
+    return f"url:{host}{path}"
+
+def key_hash(key):
+    """Hash de 64 bits (inteiro com sinal, compatível com INTEGER do SQLite) da chave canônica."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def deal_key(link):
+    """Atalho: hash de 64 bits da chave canônica do link (ou None se o link for vazio)."""
+    key = canonical_key(link)
+    return key_hash(key) if key else None
@@ -1,107 +1,470 @@
 import sqlite3
 import os
+import time
+import atexit
+import threading
+
+from database.membership import DealMembership
+from database.canonical import deal_key
 
 # O nome do arquivo do banco de dados
 DB_FILE = "deals.db"
 DB_PATH = os.path.join(os.getcwd(), DB_FILE)
 
+# Limite seguro de parâmetros por consulta (SQLite antigo aceita no máximo 999)
+MAX_SQL_VARIABLES = 900
+
+# Quantidade máxima de linhas removidas por transação na expiração incremental
+EXPIRY_BATCH_SIZE = 500
+
+# Write-behind: grava os registros pendentes a cada N ofertas ou T segundos
+WRITE_BATCH_SIZE = 10
+WRITE_FLUSH_SECONDS = 30
+
+# Pragmas aplicados a cada conexão nova (WAL permite leitores concorrentes ao escritor)
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-65536",    # 64 MB (valor negativo = KiB)
+    "PRAGMA busy_timeout=5000",
+)
+
+_local = threading.local()
+
+# Conexões devolvidas por threads de pool (ThreadPoolExecutor dos scrapers), reaproveitadas
+# pela próxima thread em vez de abrir e configurar uma conexão nova a cada ciclo
+MAX_IDLE_CONNECTIONS = 8
+_idle = []
+_idle_lock = threading.Lock()
+
+# Filtro de Bloom + LRU de positivos recentes (sobre o hash da chave canônica), aquecido em init_db()
+_membership = DealMembership()
+
+_expiry_thread = None
+_expiry_stop = threading.Event()
+
+# Ofertas registradas com queue_deal() e ainda não gravadas: key_hash -> (link, título, epoch)
+_pending = {}
+_pending_lock = threading.Lock()
+_flush_wakeup = threading.Event()
+_flush_thread = None
+
+def _open_connection():
+    """Abre uma conexão nova com os pragmas de desempenho aplicados."""
+    # A conexão pode passar de uma thread para outra via release_connection(),
+    # mas nunca é usada por duas threads ao mesmo tempo
+    conn = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 def get_connection():
-    """Retorna uma conexão com o banco de dados."""
-    return sqlite3.connect(DB_PATH)
+    """
+    Retorna a conexão de longa duração da thread atual.
+    Cada thread mantém uma única conexão em modo WAL, reaberta apenas se o
+    caminho do banco mudar ou se ela tiver sido fechada com close_connection().
+    Threads que terminam o trabalho devolvem a conexão com release_connection().
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _take_idle_connection() or _open_connection()
+        _local.conn = conn
+        _local.path = DB_PATH
+    return conn
+
+def close_connection():
+    """Fecha a conexão da thread atual (se houver)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        try:
+            conn.close()
+        finally:
+            _local.conn = None
+            _local.path = None
+
+def _take_idle_connection():
+    with _idle_lock:
+        while _idle:
+            path, conn = _idle.pop()
+            if path == DB_PATH:
+                return conn
+            conn.close()
+    return None
+
+def release_connection():
+    """
+    Devolve a conexão da thread atual ao pool de conexões ociosas.
+    Chamada ao fim das tarefas executadas em ThreadPoolExecutor, cujas threads
+    são criadas a cada ciclo: a próxima thread reaproveita a conexão já aberta.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    path = _local.path
+    _local.conn = None
+    _local.path = None
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        with _idle_lock:
+            if len(_idle) < MAX_IDLE_CONNECTIONS:
+                _idle.append((path, conn))
+                return
+    except sqlite3.Error:
+        pass
+    conn.close()
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _warm_membership(conn):
+    """Reconstrói a camada de pertinência em memória a partir da tabela 'deal_keys'."""
+    total = conn.execute("SELECT COUNT(*) FROM deal_keys").fetchone()[0]
+    # A consulta roda dentro de warm(), depois de aberta a janela que registra os add() concorrentes
+    _membership.warm(lambda: (row[0] for row in conn.execute("SELECT key_hash FROM deal_keys")), expected=total)
+    return total
+
+def _migrate_posted_at(conn):
+    """Adiciona a coluna 'posted_at' (epoch em segundos) à tabela 'deals' de bancos antigos."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(deals)")]
+    if "posted_at" in columns:
+        return
+    with conn:
+        conn.execute("ALTER TABLE deals ADD COLUMN posted_at INTEGER")
+        conn.execute("UPDATE deals SET posted_at = CAST(strftime('%s', post_date) AS INTEGER)")
+
+def _backfill_deal_keys(conn):
+    """Preenche 'deal_keys' a partir dos links já registrados em 'deals' (migração)."""
+    if conn.execute("SELECT 1 FROM deal_keys LIMIT 1").fetchone():
+        return
+    rows = conn.execute("SELECT link, posted_at FROM deals").fetchall()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO deal_keys (key_hash, link, posted_at) VALUES (?, ?, ?)",
+            ((deal_key(link), link, posted_at or int(time.time())) for link, posted_at in rows if link)
+        )
 
 def init_db():
     """
-    Inicializa o banco de dados e cria a tabela 'deals' se ela não existir.
+    Inicializa o banco de dados e cria as tabelas 'deals' e 'deal_keys' se elas não existirem.
     """
     try:
         conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Cria a tabela para armazenar os links das ofertas já postadas
-        # O LINK é a chave primária para evitar duplicatas
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS deals (
-                link TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                post_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        conn.commit()
-        print(">>> Banco de dados inicializado com sucesso.")
+
+        with conn:
+            # Histórico das ofertas postadas (link exibido e título)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS deals (
+                    link TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    post_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    posted_at INTEGER
+                )
+            """)
+            # Índice de deduplicação: hash de 64 bits da chave canônica do produto
+            # (ex: 'ml:MLB123'), independente do link de afiliado ou de rastreamento
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS deal_keys (
+                    key_hash INTEGER PRIMARY KEY,
+                    link TEXT NOT NULL,
+                    posted_at INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+        _migrate_posted_at(conn)
+        _backfill_deal_keys(conn)
+        with conn:
+            # Índices para a expiração por TTL não precisar varrer as tabelas inteiras
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_deals_posted_at ON deals (posted_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_deal_keys_posted_at ON deal_keys (posted_at)")
+
+        total = _warm_membership(conn)
+        print(f">>> Banco de dados inicializado com sucesso ({total} ofertas em cache).")
     except sqlite3.Error as e:
         print(f">>> Erro ao inicializar o banco de dados: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 def deal_exists(deal_link):
     """
-    Verifica se uma oferta com o mesmo link já existe no banco de dados.
-    
+    Verifica se o produto do link já foi registrado no banco de dados.
+    A comparação é feita pela chave canônica do produto, não pelo texto do link.
+
     Args:
         deal_link (str): O link da oferta a ser verificado.
-        
+
     Returns:
         bool: True se a oferta já existe, False caso contrário.
     """
-    exists = False
+    key = deal_key(deal_link)
+    if key is None:
+        return False
+    if key in _pending:
+        return True
+    cached = _membership.check(key)
+    if cached is not None:
+        return cached
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT 1 FROM deals WHERE link = ?", (deal_link,))
-        result = cursor.fetchone()
-        
-        if result:
-            exists = True
-            
+        cursor = get_connection().execute("SELECT 1 FROM deal_keys WHERE key_hash = ?", (key,))
+        if cursor.fetchone() is not None:
+            _membership.remember(key)
+            return True
+        return False
     except sqlite3.Error as e:
         print(f">>> Erro ao verificar a oferta no banco de dados: {e}")
-    finally:
-        if conn:
-            conn.close()
-    return exists
+    return False
 
-def add_deal(deal_link, deal_title):
+def deals_exist_many(deal_links):
     """
-    Adiciona o link de uma nova oferta ao banco de dados.
-    
+    Verifica de uma só vez quais links já existem no banco de dados.
+    Uma página inteira de cards é respondida com uma única consulta IN (...)
+    (ou poucas, se a lista ultrapassar o limite de parâmetros do SQLite).
+
     Args:
-        deal_link (str): O link da oferta.
-        deal_title (str): O título da oferta.
+        deal_links (iterable): Links das ofertas a serem verificados.
+
+    Returns:
+        set: Conjunto com os links (como recebidos) cujo produto já está registrado.
     """
+    existing = set()
+    links_by_key = {}
+    for link in deal_links:
+        key = deal_key(link)
+        if key is None:
+            continue
+        if key in _pending:
+            existing.add(link)
+            continue
+        # Apenas os possíveis positivos do filtro de Bloom vão ao banco
+        cached = _membership.check(key)
+        if cached is None:
+            links_by_key.setdefault(key, []).append(link)
+        elif cached:
+            existing.add(link)
+    if not links_by_key:
+        return existing
     try:
         conn = get_connection()
-        cursor = conn.cursor()
-        
+        for chunk in _chunks(list(links_by_key), MAX_SQL_VARIABLES):
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(f"SELECT key_hash FROM deal_keys WHERE key_hash IN ({placeholders})", chunk)
+            for (key,) in cursor:
+                existing.update(links_by_key[key])
+                _membership.remember(key)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao verificar ofertas em lote no banco de dados: {e}")
+    return existing
+
+def _write_deals(conn, rows):
+    """Grava (key_hash, link, título, epoch) em 'deals' e 'deal_keys' numa única transação."""
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO deals (link, title, posted_at) VALUES (?, ?, ?)",
+            ((link, title, posted_at) for _, link, title, posted_at in rows)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO deal_keys (key_hash, link, posted_at) VALUES (?, ?, ?)",
+            ((key, link, posted_at) for key, link, _, posted_at in rows)
+        )
+
+def add_deal(deal_link, deal_title, source_link=None):
+    """
+    Adiciona uma nova oferta ao banco de dados.
+
+    Args:
+        deal_link (str): O link da oferta (como foi postado, ex: link de afiliado).
+        deal_title (str): O título da oferta.
+        source_link (str): O link original do produto, usado para a chave canônica
+            quando o link postado não identifica o produto (ex: links curtos).
+    """
+    key = deal_key(source_link or deal_link)
+    if key is None:
+        return
+    try:
         # Insere o link, ignorando se ele já existir (por segurança, embora a verificação seja feita antes)
-        cursor.execute("INSERT OR IGNORE INTO deals (link, title) VALUES (?, ?)", (deal_link, deal_title))
-        
-        conn.commit()
+        conn = get_connection()
+        _write_deals(conn, [(key, deal_link, deal_title, int(time.time()))])
+        _membership.add(key)
+        if _membership.needs_rebuild:
+            _warm_membership(conn)
     except sqlite3.Error as e:
         print(f">>> Erro ao adicionar a oferta ao banco de dados: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-def clean_old_deals(hours=24):
+def add_deals(deals):
     """
-    Remove ofertas do banco de dados que são mais antigas que o limite de horas.
-    Isso permite que ofertas sejam repostadas após esse período.
+    Adiciona várias ofertas ao banco de dados em uma única transação.
+
+    Args:
+        deals (iterable): Tuplas (link, título) ou (link, título, link_original).
+    """
+    now = int(time.time())
+    rows = []
+    for deal in deals:
+        deal_link, deal_title = deal[0], deal[1]
+        source_link = deal[2] if len(deal) > 2 else None
+        key = deal_key(source_link or deal_link)
+        if key is not None:
+            rows.append((key, deal_link, deal_title, now))
+    if not rows:
+        return 0
+    try:
+        conn = get_connection()
+        _write_deals(conn, rows)
+        for key, _, _, _ in rows:
+            _membership.add(key)
+        if _membership.needs_rebuild:
+            _warm_membership(conn)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao adicionar as ofertas ao banco de dados: {e}")
+        return 0
+    return len(rows)
+
+def configure_write_buffer(batch_size=None, flush_seconds=None):
+    """Ajusta os limites do write-behind (quantidade de ofertas e intervalo em segundos)."""
+    global WRITE_BATCH_SIZE, WRITE_FLUSH_SECONDS
+    if batch_size:
+        WRITE_BATCH_SIZE = max(int(batch_size), 1)
+    if flush_seconds:
+        WRITE_FLUSH_SECONDS = max(float(flush_seconds), 0.1)
+
+def queue_deal(deal_link, deal_title, source_link=None):
+    """
+    Registra uma oferta postada sem gravar imediatamente no disco.
+    Os registros são agrupados em uma única transação a cada WRITE_BATCH_SIZE
+    ofertas ou WRITE_FLUSH_SECONDS segundos. Enquanto pendente, a oferta já é
+    vista como existente por deal_exists() e deals_exist_many(), então não há
+    janela para postagem em dobro.
+    """
+    key = deal_key(source_link or deal_link)
+    if key is None:
+        return
+    with _pending_lock:
+        _pending[key] = (deal_link, deal_title, int(time.time()))
+        pending_count = len(_pending)
+    _membership.add(key)
+    _ensure_flush_thread()
+    if pending_count >= WRITE_BATCH_SIZE:
+        _flush_wakeup.set()
+
+def flush_pending():
+    """
+    Grava todas as ofertas pendentes em uma única transação.
+
+    Returns:
+        int: Quantidade de ofertas gravadas.
+    """
+    with _pending_lock:
+        rows = [(key, link, title, posted_at) for key, (link, title, posted_at) in _pending.items()]
+    if not rows:
+        return 0
+    try:
+        _write_deals(get_connection(), rows)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao gravar ofertas pendentes no banco de dados: {e}")
+        return 0
+    # Reinsere no filtro: um warm() feito enquanto estavam pendentes não as viu no banco
+    for key, _, _, _ in rows:
+        _membership.add(key)
+    # Só remove da lista de pendentes depois do commit
+    with _pending_lock:
+        for key, link, title, posted_at in rows:
+            if _pending.get(key) == (link, title, posted_at):
+                del _pending[key]
+    return len(rows)
+
+def _flush_loop():
+    while True:
+        _flush_wakeup.wait(WRITE_FLUSH_SECONDS)
+        _flush_wakeup.clear()
+        flush_pending()
+
+def _ensure_flush_thread():
+    global _flush_thread
+    with _pending_lock:
+        if _flush_thread is not None and _flush_thread.is_alive():
+            return
+        _flush_thread = threading.Thread(target=_flush_loop, name="deals-writer", daemon=True)
+        _flush_thread.start()
+
+# Garante a gravação dos pendentes no encerramento normal do processo
+atexit.register(flush_pending)
+
+def expire_deals(hours=24, batch_size=EXPIRY_BATCH_SIZE, pause=0.05, stop_event=None):
     """
+    Remove, em lotes pequenos, as ofertas mais antigas que o limite de horas.
+    Cada lote é uma transação curta sobre o índice de 'posted_at', então o
+    banco nunca fica bloqueado por muito tempo para os scrapers.
+
+    Returns:
+        int: Quantidade de ofertas removidas.
+    """
+    cutoff = int(time.time() - hours * 3600)
+    removed = 0
+    keys_removed = 0
     try:
         conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute(f"DELETE FROM deals WHERE post_date < datetime('now', '-{hours} hours')")
-        
-        count = cursor.rowcount
-        conn.commit()
-        if count > 0:
-            print(f">>> Limpeza: {count} ofertas expiradas (> {hours}h) foram removidas do banco.")
+        while stop_event is None or not stop_event.is_set():
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM deals WHERE rowid IN "
+                    "(SELECT rowid FROM deals WHERE posted_at < ? LIMIT ?)",
+                    (cutoff, batch_size)
+                ).rowcount
+                deleted_keys = conn.execute(
+                    "DELETE FROM deal_keys WHERE key_hash IN "
+                    "(SELECT key_hash FROM deal_keys WHERE posted_at < ? LIMIT ?)",
+                    (cutoff, batch_size)
+                ).rowcount
+            removed += deleted
+            keys_removed += deleted_keys
+            if deleted < batch_size and deleted_keys < batch_size:
+                break
+            # Libera o lock de escrita entre os lotes
+            time.sleep(pause)
+
+        if keys_removed > 0:
+            # O filtro de Bloom não suporta remoção: reconstrói sem os links expirados
+            _warm_membership(conn)
+        if removed > 0:
+            print(f">>> Limpeza: {removed} ofertas expiradas (> {hours}h) foram removidas do banco.")
     except sqlite3.Error as e:
         print(f">>> Erro ao limpar ofertas antigas: {e}")
-    finally:
-        if conn:
-            conn.close()
+    return removed
+
+def clean_old_deals(hours=24):
+    """
+    Remove ofertas do banco de dados que são mais antigas que o limite de horas.
+    Isso permite que ofertas sejam repostadas após esse período.
+    """
+    return expire_deals(hours)
+
+def _expiry_loop(hours, interval):
+    while not _expiry_stop.is_set():
+        expire_deals(hours, stop_event=_expiry_stop)
+        _expiry_stop.wait(interval)
+    close_connection()
+
+def start_expiry_worker(hours=24, interval=300):
+    """
+    Inicia uma thread em segundo plano que expira ofertas antigas a cada
+    'interval' segundos, fora do caminho crítico do ciclo de postagem.
+    """
+    global _expiry_thread
+    if _expiry_thread is not None and _expiry_thread.is_alive():
+        return _expiry_thread
+    _expiry_stop.clear()
+    _expiry_thread = threading.Thread(
+        target=_expiry_loop, args=(hours, interval), name="deals-expiry", daemon=True
+    )
+    _expiry_thread.start()
+    return _expiry_thread
+
+def stop_expiry_worker(timeout=5):
+    """Sinaliza a thread de expiração para parar e aguarda o término."""
+    global _expiry_thread
+    _expiry_stop.set()
+    if _expiry_thread is not None:
+        _expiry_thread.join(timeout)
+        _expiry_thread = None
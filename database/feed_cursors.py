@@ -0,0 +1,55 @@
+import time
+import sqlite3
+
+from database.database import get_connection
+
+def init_feed_cursors():
+    """
+    Cria a tabela com a próxima página de cada feed paginado (ex: categoria,
+    mais vendidos, maior comissão da Shopee), para que cada ciclo continue de
+    onde o anterior parou em vez de sortear páginas que já foram vistas.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS feed_cursors (
+                    feed TEXT PRIMARY KEY,
+                    page INTEGER NOT NULL,
+                    updated_at INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao inicializar os cursores de feeds: {e}")
+
+def get_cursors(feeds):
+    """Retorna feed -> próxima página (1 para feeds ainda não percorridos)."""
+    feeds = list(feeds)
+    cursors = {feed: 1 for feed in feeds}
+    if not feeds:
+        return cursors
+    try:
+        placeholders = ",".join("?" * len(feeds))
+        cursor = get_connection().execute(
+            f"SELECT feed, page FROM feed_cursors WHERE feed IN ({placeholders})", feeds
+        )
+        for feed, page in cursor:
+            cursors[feed] = page
+    except sqlite3.Error as e:
+        print(f">>> Erro ao consultar os cursores de feeds: {e}")
+    return cursors
+
+def save_cursors(cursors):
+    """Grava a próxima página de cada feed em uma única transação."""
+    if not cursors:
+        return
+    now = int(time.time())
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO feed_cursors (feed, page, updated_at) VALUES (?, ?, ?)",
+                [(feed, page, now) for feed, page in cursors.items()]
+            )
+    except sqlite3.Error as e:
+        print(f">>> Erro ao gravar os cursores de feeds: {e}")
@@ -0,0 +1,96 @@
+import math
+import time
+import random
+import sqlite3
+
+from database.database import get_connection, MAX_SQL_VARIABLES
+
+def init_keyword_stats():
+    """
+    Cria a tabela com o rendimento de cada palavra-chave da Shopee:
+    requisições, ofertas válidas e inéditas, duplicatas e latência acumulada.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shopee_keyword_stats (
+                    keyword TEXT PRIMARY KEY,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    valid INTEGER NOT NULL DEFAULT 0,
+                    duplicates INTEGER NOT NULL DEFAULT 0,
+                    latency_ms INTEGER NOT NULL DEFAULT 0,
+                    updated_at INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao inicializar as estatísticas de palavras-chave: {e}")
+
+def record_keyword_stats(rows):
+    """
+    Soma o resultado de uma rodada de buscas, em uma única transação.
+
+    Args:
+        rows (list): Tuplas (palavra-chave, ofertas válidas, duplicatas, latência em ms).
+    """
+    if not rows:
+        return
+    now = int(time.time())
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany("""
+                INSERT INTO shopee_keyword_stats (keyword, requests, valid, duplicates, latency_ms, updated_at)
+                VALUES (?, 1, ?, ?, ?, ?)
+                ON CONFLICT(keyword) DO UPDATE SET
+                    requests = requests + 1,
+                    valid = valid + excluded.valid,
+                    duplicates = duplicates + excluded.duplicates,
+                    latency_ms = latency_ms + excluded.latency_ms,
+                    updated_at = excluded.updated_at
+            """, [(kw, valid, duplicates, int(latency_ms), now) for kw, valid, duplicates, latency_ms in rows])
+    except sqlite3.Error as e:
+        print(f">>> Erro ao gravar as estatísticas de palavras-chave: {e}")
+
+def get_keyword_stats(keywords):
+    """Retorna palavra-chave -> (requisições, válidas, duplicatas, latência total em ms)."""
+    keywords = list(keywords)
+    stats = {}
+    try:
+        conn = get_connection()
+        for start in range(0, len(keywords), MAX_SQL_VARIABLES):
+            chunk = keywords[start:start + MAX_SQL_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(
+                f"SELECT keyword, requests, valid, duplicates, latency_ms FROM shopee_keyword_stats "
+                f"WHERE keyword IN ({placeholders})",
+                chunk
+            )
+            for keyword, requests, valid, duplicates, latency_ms in cursor:
+                stats[keyword] = (requests, valid, duplicates, latency_ms)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao consultar as estatísticas de palavras-chave: {e}")
+    return stats
+
+def schedule_keywords(keywords, exploration=1.0):
+    """
+    Ordena as palavras-chave pelo rendimento medido (bandit UCB1): primeiro as
+    nunca testadas, depois pela média de ofertas válidas por requisição somada
+    a um bônus de exploração que cresce para as pouco testadas. Assim o
+    orçamento de requisições vai para as palavras produtivas sem abandonar as demais.
+
+    Args:
+        keywords (list): Palavras-chave disponíveis.
+        exploration (float): Peso do bônus de exploração (0 = só rendimento).
+    """
+    stats = get_keyword_stats(keywords)
+    total = sum(s[0] for s in stats.values()) or 1
+
+    def score(keyword):
+        requests, valid = stats.get(keyword, (0, 0, 0, 0))[:2]
+        if requests == 0:
+            return float("inf")
+        return valid / requests + exploration * math.sqrt(2 * math.log(total) / requests)
+
+    # O desempate aleatório evita repetir sempre a mesma ordem entre empatadas
+    return sorted(keywords, key=lambda kw: (score(kw), random.random()), reverse=True)
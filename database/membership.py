@@ -0,0 +1,143 @@
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+class BloomFilter:
+    """
+    Filtro de Bloom simples sobre um bytearray.
+    Responde "com certeza não existe" sem falsos negativos; positivos podem
+    ser falsos (na taxa configurada) e precisam ser confirmados no banco.
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+class LRUSet:
+    """Conjunto limitado que descarta os itens usados há mais tempo."""
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def add(self, item):
+        self._items[item] = None
+        self._items.move_to_end(item)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def discard(self, item):
+        self._items.pop(item, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def __contains__(self, item):
+        if item in self._items:
+            self._items.move_to_end(item)
+            return True
+        return False
+
+class DealMembership:
+    """
+    Camada de pertinência em memória na frente da tabela 'deals'.
+    O Filtro de Bloom elimina as consultas negativas (a grande maioria, pois
+    raspamos muito mais cards do que postamos) e o LRU guarda os positivos
+    recentes. Enquanto não for aquecida com warm(), a camada não responde nada
+    e todas as consultas vão ao banco.
+    """
+    def __init__(self, min_capacity=100000, error_rate=0.01, hot_size=4096):
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        # Serializa as reconstruções (worker de expiração x needs_rebuild)
+        self._warm_lock = threading.Lock()
+        self._bloom = None
+        self._hot = LRUSet(hot_size)
+        # Itens adicionados enquanto um warm() está em andamento
+        self._added_during_warm = None
+
+    @property
+    def ready(self):
+        return self._bloom is not None
+
+    def warm(self, load, expected=0):
+        """
+        (Re)constrói o filtro a partir de todos os itens existentes no banco.
+
+        Args:
+            load (callable): Retorna um iterável com os itens. É chamada só depois
+                de abrir o registro dos add() concorrentes, então nenhum item gravado
+                entre a consulta e a troca do filtro fica de fora.
+            expected (int): Quantidade aproximada de itens (dimensiona o filtro).
+        """
+        with self._warm_lock:
+            with self._lock:
+                self._added_during_warm = []
+            try:
+                bloom = BloomFilter(max(expected * 2, self.min_capacity), self.error_rate)
+                for item in load():
+                    bloom.add(item)
+            except Exception:
+                with self._lock:
+                    self._added_during_warm = None
+                raise
+            with self._lock:
+                # Não perde registros feitos por outras threads durante a reconstrução
+                for item in self._added_during_warm:
+                    bloom.add(item)
+                self._added_during_warm = None
+                self._bloom = bloom
+                self._hot.clear()
+
+    @property
+    def needs_rebuild(self):
+        bloom = self._bloom
+        return bloom is not None and bloom.count > bloom.capacity
+
+    def add(self, item):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(item)
+            if self._added_during_warm is not None:
+                self._added_during_warm.append(item)
+            self._hot.add(item)
+
+    def remember(self, item):
+        """Registra um positivo confirmado no banco."""
+        with self._lock:
+            self._hot.add(item)
+
+    def check(self, item):
+        """
+        Returns:
+            True se o item com certeza existe (LRU), False se com certeza não
+            existe (Bloom) ou None se for preciso consultar o banco.
+        """
+        with self._lock:
+            if self._bloom is None:
+                return None
+            if item in self._hot:
+                return True
+            if item not in self._bloom:
+                return False
+        return None
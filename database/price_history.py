@@ -0,0 +1,159 @@
+import re
+import time
+import sqlite3
+
+from database.database import get_connection
+from database.canonical import canonical_key, key_hash
+
+# Só grupos de milhar ('1.299', '12.345.678'): sem vírgula, o ponto pode ser decimal ('R$ 1299.90')
+THOUSANDS_RE = re.compile(r'^\d{1,3}(?:\.\d{3})+$')
+
+def price_to_cents(price):
+    """
+    Converte um preço ('R$ 1.200,50', 'R$ 1.299', '1200.5' ou número) para
+    centavos inteiros. Vírgula é sempre o separador decimal; com 'R$' e sem
+    vírgula, pontos em grupos de três dígitos são separadores de milhar.
+    """
+    if price is None:
+        return None
+    if isinstance(price, (int, float)):
+        return int(round(price * 100))
+    text = str(price)
+    clean = text.replace("R$", "").strip()
+    if not clean or not clean[0].isdigit():
+        return None
+    try:
+        if "," in clean or ("R$" in text and THOUSANDS_RE.match(clean)):
+            # Formato BR: pontos de milhar e vírgula decimal ('R$ 1.299' = mil e duzentos)
+            clean = clean.replace(".", "").replace(",", ".")
+        return int(round(float(clean) * 100))
+    except ValueError:
+        return None
+
+def _deal_source_link(deal):
+    return deal.get("link_original") or deal.get("link")
+
+def init_price_history():
+    """
+    Cria a tabela de histórico de preços (somente inserção).
+    A chave primária (produto, instante) agrupa as observações de cada produto
+    em ordem cronológica, então as consultas por produto e janela de tempo são
+    varreduras de intervalo cobertas pela própria tabela (WITHOUT ROWID).
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_history (
+                    key_hash INTEGER NOT NULL,
+                    observed_at INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    price_cents INTEGER NOT NULL,
+                    original_cents INTEGER,
+                    PRIMARY KEY (key_hash, observed_at)
+                ) WITHOUT ROWID
+            """)
+    except sqlite3.Error as e:
+        print(f">>> Erro ao inicializar o histórico de preços: {e}")
+
+def record_prices(deals, observed_at=None):
+    """
+    Registra o preço atual de várias ofertas em uma única transação.
+    Os scrapers chamam a função com todos os produtos lidos nas listagens
+    (inclusive os já postados e os que passam do limite), para que cada
+    produto acumule observações a cada ciclo.
+
+    Returns:
+        int: Quantidade de observações gravadas.
+    """
+    observed_at = int(observed_at or time.time())
+    rows = []
+    for deal in deals:
+        key = canonical_key(_deal_source_link(deal))
+        price_cents = price_to_cents(deal.get("preco"))
+        if not key or price_cents is None:
+            continue
+        source = key.split(":", 1)[0]
+        rows.append((key_hash(key), observed_at, source, price_cents, price_to_cents(deal.get("preco_original"))))
+    if not rows:
+        return 0
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO price_history "
+                "(key_hash, observed_at, source, price_cents, original_cents) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+    except sqlite3.Error as e:
+        print(f">>> Erro ao registrar histórico de preços: {e}")
+        return 0
+    return len(rows)
+
+def price_stats(deals, days=30, before=None):
+    """
+    Calcula, para todas as ofertas de uma vez, o menor preço e a mediana dos
+    últimos 'days' dias. Os produtos candidatos vão para uma tabela temporária
+    e uma única consulta devolve as observações já ordenadas por produto.
+    Com 'before' (epoch), as observações a partir desse instante (ex: as do
+    ciclo atual) ficam de fora.
+
+    Returns:
+        dict: key_hash -> {"lowest": centavos, "median": centavos, "count": n}
+    """
+    keys = set()
+    for deal in deals:
+        key = canonical_key(_deal_source_link(deal))
+        if key:
+            keys.add(key_hash(key))
+    stats = {}
+    if not keys:
+        return stats
+    since = int(time.time() - days * 86400)
+    until = int(before) if before is not None else 2 ** 62
+    try:
+        conn = get_connection()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS price_candidates (key_hash INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM price_candidates")
+        conn.executemany("INSERT OR IGNORE INTO price_candidates (key_hash) VALUES (?)", ((k,) for k in keys))
+        cursor = conn.execute(
+            "SELECT p.key_hash, p.price_cents FROM price_candidates c "
+            "JOIN price_history p ON p.key_hash = c.key_hash AND p.observed_at >= ? AND p.observed_at < ? "
+            "ORDER BY p.key_hash, p.price_cents",
+            (since, until)
+        )
+        prices_by_key = {}
+        for key, price_cents in cursor:
+            prices_by_key.setdefault(key, []).append(price_cents)
+        conn.execute("DELETE FROM price_candidates")
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f">>> Erro ao consultar histórico de preços: {e}")
+        return stats
+
+    for key, prices in prices_by_key.items():
+        middle = len(prices) // 2
+        median = prices[middle] if len(prices) % 2 else (prices[middle - 1] + prices[middle]) // 2
+        stats[key] = {"lowest": prices[0], "median": median, "count": len(prices)}
+    return stats
+
+def annotate_price_drops(deals, days=30, before=None):
+    """
+    Preenche em cada oferta 'menor_preco_dias' (centavos) e 'queda_mediana'
+    (percentual do preço atual abaixo da mediana de 'days' dias; negativo se
+    estiver acima). Ofertas sem histórico ficam com os dois campos em None.
+    'before' exclui as observações já gravadas no ciclo atual (ver price_stats).
+    """
+    stats = price_stats(deals, days, before)
+    for deal in deals:
+        deal["menor_preco_dias"] = None
+        deal["queda_mediana"] = None
+        key = canonical_key(_deal_source_link(deal))
+        current = price_to_cents(deal.get("preco"))
+        info = stats.get(key_hash(key)) if key else None
+        if not info or current is None:
+            continue
+        deal["menor_preco_dias"] = info["lowest"]
+        if info["median"] > 0:
+            deal["queda_mediana"] = round((info["median"] - current) * 100.0 / info["median"], 1)
+    return deals
@@ -0,0 +1,135 @@
+import json
+import time
+import random
+import sqlite3
+
+from database.database import get_connection, deals_exist_many
+from database.canonical import deal_key
+
+# Quantas vezes um candidato pode ser sorteado sem ser postado (recusado pelos
+# filtros do app ou perdido em um ciclo cancelado) antes de sair do reservatório
+MAX_DRAWS = 3
+
+def init_shopee_reservoir():
+    """
+    Cria a tabela do reservatório de candidatos da Shopee.
+    Cada consulta à API devolve até 20 produtos, mas só alguns são postados
+    no ciclo; os demais que passaram nos filtros ficam guardados aqui (por
+    palavra-chave) e são usados nos próximos ciclos antes de chamar a API.
+    'draws' conta quantas vezes o candidato já foi sorteado sem ser postado.
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shopee_reservoir (
+                    key_hash INTEGER PRIMARY KEY,
+                    keyword TEXT NOT NULL,
+                    deal TEXT NOT NULL,
+                    stored_at INTEGER NOT NULL,
+                    draws INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            """)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(shopee_reservoir)")]
+            if "draws" not in columns:
+                conn.execute("ALTER TABLE shopee_reservoir ADD COLUMN draws INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_shopee_reservoir_keyword ON shopee_reservoir (keyword, stored_at)")
+    except sqlite3.Error as e:
+        print(f">>> Erro ao inicializar o reservatório da Shopee: {e}")
+
+def store_candidates(candidates, bucket_size=20):
+    """
+    Guarda candidatos válidos no reservatório, em uma única transação.
+    Cada palavra-chave mantém no máximo 'bucket_size' candidatos (os mais recentes).
+    Um candidato regravado volta com o preço atual e a contagem de sorteios zerada.
+
+    Args:
+        candidates (list): Tuplas (palavra-chave, oferta). A oferta precisa de 'link_original'.
+    """
+    now = int(time.time())
+    rows = []
+    for keyword, deal in candidates:
+        key = deal_key(deal.get("link_original") or deal.get("link"))
+        if key is not None:
+            rows.append((key, keyword, json.dumps(deal, ensure_ascii=False), now))
+    if not rows:
+        return
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO shopee_reservoir (key_hash, keyword, deal, stored_at, draws) VALUES (?, ?, ?, ?, 0)",
+                rows
+            )
+            for keyword in {row[1] for row in rows}:
+                conn.execute("""
+                    DELETE FROM shopee_reservoir WHERE keyword = ? AND key_hash NOT IN (
+                        SELECT key_hash FROM shopee_reservoir WHERE keyword = ? ORDER BY stored_at DESC LIMIT ?
+                    )
+                """, (keyword, keyword, bucket_size))
+    except sqlite3.Error as e:
+        print(f">>> Erro ao gravar o reservatório da Shopee: {e}")
+
+def draw_candidates(limit, ttl_hours=2, existing_links=deals_exist_many):
+    """
+    Sorteia do reservatório até 'limit' ofertas ainda válidas, alternando entre
+    as palavras-chave (em ordem sorteada) para manter a variedade. Candidatos vencidos e produtos
+    que já foram postados são descartados no caminho.
+
+    Os sorteados não são apagados: se o app recusar a oferta (preço mínimo,
+    queda de preço) ou o ciclo for cancelado antes da postagem, ela continua
+    disponível. Depois de postada, sai no próximo sorteio (já existe no banco);
+    se nunca for postada, sai após MAX_DRAWS sorteios ou ao vencer 'ttl_hours'
+    (que também limita a idade do preço guardado).
+
+    Returns:
+        list: Ofertas (dicts no formato do scraper), menos sorteadas e mais recentes primeiro.
+    """
+    since = int(time.time() - ttl_hours * 3600)
+    drawn = []
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute("DELETE FROM shopee_reservoir WHERE stored_at < ?", (since,))
+        rows = conn.execute(
+            "SELECT key_hash, keyword, deal FROM shopee_reservoir ORDER BY keyword, draws, stored_at DESC"
+        ).fetchall()
+        if not rows or limit <= 0:
+            return drawn
+
+        buckets = {}
+        for key, keyword, deal in rows:
+            buckets.setdefault(keyword, []).append((key, json.loads(deal)))
+        existing = existing_links(deal.get("link_original") for bucket in buckets.values() for _, deal in bucket)
+
+        # Uma oferta por palavra-chave a cada rodada. A ordem dos baldes é
+        # sorteada para que todos sejam usados antes de vencer (e não só os
+        # primeiros em ordem alfabética)
+        posted_keys = []
+        drawn_keys = []
+        queues = list(buckets.values())
+        random.shuffle(queues)
+        while queues and len(drawn) < limit:
+            next_round = []
+            for queue in queues:
+                while queue:
+                    key, deal = queue.pop(0)
+                    if deal.get("link_original") in existing:
+                        posted_keys.append((key,))
+                        continue
+                    drawn_keys.append((key,))
+                    drawn.append(deal)
+                    break
+                if queue:
+                    next_round.append(queue)
+                if len(drawn) >= limit:
+                    break
+            queues = next_round
+
+        with conn:
+            conn.executemany("DELETE FROM shopee_reservoir WHERE key_hash = ?", posted_keys)
+            conn.executemany("UPDATE shopee_reservoir SET draws = draws + 1 WHERE key_hash = ?", drawn_keys)
+            conn.execute("DELETE FROM shopee_reservoir WHERE draws >= ?", (MAX_DRAWS,))
+    except (sqlite3.Error, ValueError) as e:
+        print(f">>> Erro ao consultar o reservatório da Shopee: {e}")
+    return drawn
@@ -17,13 +17,19 @@ except ImportError:
 
 # Adiciona o diretório do projeto ao PATH
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from scrapers.magazine_luiza import get_chrome_main_version
+from utils.browser_manager import get_chrome_main_version, request_profile_release, clear_profile_release
+from utils.ml_affiliate_session import save_session
 
 def main():
     print("=== ASSISTENTE DE LOGIN - MERCADO LIVRE AFILIADOS ===")
     
     session_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessao_chrome")
     print("Caminho do perfil Chrome:", session_path)
+
+    # O bot mantém um Chrome aberto neste perfil; pede que ele o feche durante o login
+    print("Pedindo ao bot (se estiver rodando) que libere o perfil do Chrome...")
+    if not request_profile_release(session_path):
+        print("Aviso: O perfil continua em uso. Se o Chrome não abrir, encerre o bot e tente novamente.")
     
     print("Detectando versão do Chrome...")
     version = get_chrome_main_version()
@@ -91,6 +97,9 @@ def main():
         response = session.post(api_url, json=payload, headers=headers, timeout=15)
         
         print(f"Status Code da resposta: {response.status_code}")
+        if response.status_code == 200:
+            # Salva a sessão para o bot gerar links via HTTP, sem abrir o Chrome a cada ciclo
+            save_session(cookies, csrf_token, headers["user-agent"])
         try:
             res_json = response.json()
             print("Resposta JSON da API:")
@@ -106,6 +115,9 @@ def main():
         
     except Exception as e:
         print("\nErro ocorrido:", e)
+    finally:
+        # Devolve o perfil ao bot
+        clear_profile_release()
 
 if __name__ == "__main__":
     main()
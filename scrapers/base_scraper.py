@@ -12,6 +12,26 @@ class BaseScraper(ABC):
         """
         pass
 
+    def iter_deals(self):
+        """
+        Entrega as ofertas uma a uma, assim que ficam prontas, para que a
+        postagem comece sem esperar a coleta inteira. Scrapers que não
+        implementam a versão em fluxo usam este adaptador sobre fetch_deals().
+        """
+        yield from self.fetch_deals() or []
+
+    def cancel(self):
+        """
+        Pede a interrupção do scraper (ex: prazo do ciclo esgotado).
+        A interrupção é cooperativa: os laços de busca consultam is_cancelled()
+        e param na próxima oportunidade.
+        """
+        self._cancelled = True
+
+    def is_cancelled(self):
+        """Indica se cancel() foi chamado."""
+        return getattr(self, "_cancelled", False)
+
     def close(self):
         """
         Método opcional para limpeza de recursos (ex: fechar navegador).
@@ -1,95 +1,478 @@
 import os
+import re
 import sys
+import json
 import time
-# Correção para Python 3.12+: O undetected_chromedriver precisa do distutils,
-# que foi removido. Importar o setuptools restaura essa funcionalidade.
-try:
-    import setuptools
-except ImportError:
-    pass
+import threading
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-uc_error = None
+from selenium.common.exceptions import TimeoutException
+
 try:
-    import undetected_chromedriver as uc
-except Exception as e:
-    uc = None
-    uc_error = e
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
 
 from .base_scraper import BaseScraper
-from database.database import deal_exists
-
-def get_chrome_main_version():
-    """Tenta detectar a versão principal do Chrome instalado no Windows."""
-    import subprocess
-    import re
-    
-    commands = [
-        r'reg query "HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon" /v version',
-        r'reg query "HKEY_LOCAL_MACHINE\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall\Google Chrome" /v version',
-        r'(Get-Item "C:\Program Files\Google\Chrome\Application\chrome.exe").VersionInfo.ProductVersion',
-        r'(Get-Item "C:\Program Files (x86)\Google\Chrome\Application\chrome.exe").VersionInfo.ProductVersion'
-    ]
-    
-    for cmd in commands:
-        try:
-            if "reg query" in cmd:
-                output = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL).decode()
-                version = re.search(r'(\d+)\.', output)
-                if version:
-                    return int(version.group(1))
-            else:
-                # PowerShell commands
-                ps_cmd = f"powershell -command \"{cmd}\""
-                output = subprocess.check_output(ps_cmd, shell=True, stderr=subprocess.DEVNULL).decode().strip()
-                version = re.search(r'^(\d+)', output)
-                if version:
-                    return int(version.group(1))
-        except:
+from utils.http import get_session
+from utils.html import HTML_PARSER
+from database.database import deals_exist_many, release_connection
+from database.canonical import deal_key
+from database.price_history import record_prices
+from utils.browser_manager import get_browser_manager, get_chrome_main_version, uc, uc_error  # noqa: F401
+
+CARD_SELECTOR = '[data-testid="product-card-container"]'
+
+# Lê todos os campos de todos os cards em uma única chamada ao WebDriver
+# (em vez de 5 a 7 find_element por card, cada um com sua própria ida e volta HTTP)
+EXTRACT_CARDS_JS = """
+const text = (root, sel) => {
+    const el = root.querySelector(sel);
+    return el ? (el.innerText || '').trim() : '';
+};
+return Array.from(document.querySelectorAll(arguments[0])).map(card => {
+    const pix = Array.from(card.querySelectorAll('span')).find(s => s.textContent.includes('desconto no pix'));
+    const img = card.querySelector('img[data-testid="image"]');
+    return {
+        link: card.href || card.getAttribute('href') || '',
+        titulo: text(card, '[data-testid="product-title"]'),
+        preco: text(card, '[data-testid="price-value"]'),
+        preco_original: text(card, '[data-testid="price-original"]'),
+        parcelamento: text(card, '[data-testid="installment"]'),
+        desconto_pix: pix ? (pix.innerText || '').trim() : '',
+        imagem: img ? img.src : null
+    };
+});
+"""
+
+# Miniaturas do CDN do Magalu trazem o tamanho no caminho:
+# https://a-static.mlcdn.com.br/280x210/produto/loja/sku/hash.jpeg
+THUMBNAIL_SIZE_RE = re.compile(r'(://a-static\.mlcdn\.com\.br/)\d+x\d+/')
+
+# Sinais de desafio anti-bot: o contêiner do PerimeterX ou um <title> de bloqueio.
+# Substrings soltas como "captcha" não servem: páginas normais carregam scripts de reCAPTCHA
+CHALLENGE_CONTAINER_RE = re.compile(r'id=["\']px-captcha["\']', re.IGNORECASE)
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+CHALLENGE_TITLES = ("captcha", "access denied", "are you a robot", "verifique que voce e humano",
+                    "verifique que você é humano", "just a moment", "attention required")
+
+def hq_image_url(url, size="1500x1500"):
+    """Troca o tamanho da miniatura do CDN pelo tamanho grande (sem abrir a página do produto)."""
+    if not url:
+        return url
+    return THUMBNAIL_SIZE_RE.sub(lambda m: f"{m.group(1)}{size}/", url, count=1)
+
+def is_challenge(status_code, html):
+    """Indica se a resposta é um bloqueio ou desafio anti-bot em vez da página real."""
+    if status_code in (403, 429):
+        return True
+    head = (html or "")[:20000]
+    if CHALLENGE_CONTAINER_RE.search(head):
+        return True
+    title = TITLE_RE.search(head)
+    return bool(title) and any(marker in title.group(1).lower() for marker in CHALLENGE_TITLES)
+
+def parse_product_page(html):
+    """
+    Lê a imagem principal e o cupom da página de um produto.
+
+    Returns:
+        dict: imagem, cupom_codigo e cupom_desconto (None quando ausentes).
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    details = {"imagem": None, "cupom_codigo": None, "cupom_desconto": None}
+
+    img = soup.select_one('[data-testid="image-selected-thumbnail"]')
+    if img and img.get("src"):
+        details["imagem"] = img["src"]
+    else:
+        og_image = soup.select_one('meta[property="og:image"]')
+        if og_image and og_image.get("content"):
+            details["imagem"] = og_image["content"]
+
+    coupon_input = soup.select_one('input[data-testid="coupon-code-input"]')
+    if coupon_input and coupon_input.get("value"):
+        details["cupom_codigo"] = coupon_input["value"]
+        strong = soup.select_one('[data-testid="coupon-code-copy"] strong')
+        if strong:
+            details["cupom_desconto"] = strong.get_text(strip=True)
+    return details
+
+def _node_text(node):
+    # Equivalente ao innerText do navegador para o conteúdo dos cards
+    return " ".join(node.get_text().split()) if node else ""
+
+def _format_brl(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return ""
+    return "R$ " + f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _cards_from_next_data(html, base_url):
+    """Lê os produtos do JSON embutido pelo Next.js (__NEXT_DATA__) quando os cards não vêm no HTML."""
+    match = re.search(r'<script[^>]+id="__NEXT_DATA__"[^>]*>(.*?)</script>', html, re.S)
+    if not match:
+        return []
+    try:
+        data = json.loads(match.group(1))
+    except ValueError:
+        return []
+
+    cards, seen, stack = [], set(), [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
             continue
-    return None
+        price = node.get("price")
+        path = node.get("path") or node.get("url")
+        if node.get("title") and isinstance(price, dict) and isinstance(path, str):
+            link = urljoin(base_url, path)
+            if link not in seen:
+                seen.add(link)
+                image = node.get("image") or ""
+                cards.append({
+                    "link": link,
+                    "titulo": node["title"],
+                    "preco": _format_brl(price.get("bestPrice") or price.get("price")),
+                    "preco_original": _format_brl(price.get("fullPrice")) if price.get("fullPrice") != price.get("bestPrice") else "",
+                    "parcelamento": "",
+                    "desconto_pix": "",
+                    "imagem": image.replace("{w}x{h}", "280x210") if isinstance(image, str) and image else None
+                })
+            continue
+        stack.extend(reversed(list(node.values())))
+    return cards
+
+def parse_listing_html(html, base_url):
+    """
+    Extrai os cards de uma página de listagem baixada via HTTP, no mesmo formato
+    da extração pelo navegador (EXTRACT_CARDS_JS). Usa o HTML renderizado no
+    servidor e, se ele não trouxer os cards, o JSON do __NEXT_DATA__.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    cards = []
+    for card in soup.select(CARD_SELECTOR):
+        href = card.get("href")
+        if not href:
+            anchor = card.find("a", href=True)
+            href = anchor["href"] if anchor else ""
+        pix = next((span for span in card.find_all("span") if "desconto no pix" in span.get_text()), None)
+        img = card.select_one('img[data-testid="image"]')
+        cards.append({
+            "link": urljoin(base_url, href) if href else "",
+            "titulo": _node_text(card.select_one('[data-testid="product-title"]')),
+            "preco": _node_text(card.select_one('[data-testid="price-value"]')),
+            "preco_original": _node_text(card.select_one('[data-testid="price-original"]')),
+            "parcelamento": _node_text(card.select_one('[data-testid="installment"]')),
+            "desconto_pix": _node_text(pix),
+            "imagem": urljoin(base_url, img["src"]) if img and img.get("src") else None
+        })
+    return cards or _cards_from_next_data(html, base_url)
 
 class MagazineLuizaScraper(BaseScraper):
-    def __init__(self, url, session_path, limit=3):
-        if uc is None:
+    def __init__(self, url, session_path, limit=3, mode=None, seen=None, seen_lock=None):
+        # http: só requisições HTTP; browser: sempre o Chrome;
+        # auto: HTTP e o Chrome apenas se a página cair em desafio anti-bot
+        self.mode = (mode or os.getenv("MAGAZINE_LUIZA_MODE", "auto")).lower()
+        if self.mode not in ("auto", "http", "browser"):
+            self.mode = "auto"
+        if uc is None and self.mode == "browser":
             print(f">>> ERRO DETALHADO AO IMPORTAR: {uc_error}")
             print(">>> undetected_chromedriver não instalado. Execute: pip install undetected-chromedriver")
             sys.exit(1)
+        # A listagem HTTP e as páginas de produto (em qualquer modo) são lidas com o BeautifulSoup
+        if BeautifulSoup is None:
+            print(">>> beautifulsoup4 não instalado. Execute: pip install beautifulsoup4")
+            sys.exit(1)
         self.url = url
         self.session_path = session_path
         self.limit = limit
-        self.driver = self._iniciar_driver()
-
-    def _iniciar_driver(self):
-        """Configura e inicia o WebDriver com persistência de sessão."""
-        print(">>> Detectando versão do Chrome...")
-        detected_version = get_chrome_main_version()
-        if detected_version:
-            print(f">>> Chrome v{detected_version} detectado.")
-        else:
-            detected_version = 148 # Fallback
-            print(f">>> Versão não detectada, usando fallback v{detected_version}")
-
-        print(">>> Iniciando Browser...")
-        chrome_options = uc.ChromeOptions()
-        chrome_options.add_argument(f"--user-data-dir={self.session_path}")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-notifications")
-        
-        driver = uc.Chrome(options=chrome_options, version_main=detected_version)
-        return driver
+        # Chaves canônicas (database.canonical) dos produtos já escolhidos por
+        # outras categorias no mesmo ciclo (varredura paralela)
+        self.seen = seen if seen is not None else set()
+        self.seen_lock = seen_lock or threading.Lock()
+        # Páginas de produto baixadas em paralelo no enriquecimento (imagem HQ e cupom)
+        # e tempo máximo de espera por página
+        try:
+            self.workers = max(int(os.getenv("MAGAZINE_LUIZA_WORKERS", 4)), 1)
+            self.page_timeout = float(os.getenv("MAGAZINE_LUIZA_PAGE_TIMEOUT", 10))
+        except ValueError:
+            self.workers, self.page_timeout = 4, 10
+        self.image_size = os.getenv("MAGAZINE_LUIZA_IMAGE_SIZE", "1500x1500")
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36',
+            'Accept-Language': 'pt-BR,pt;q=0.9'
+        }
+        # Sem reenvio após timeout de leitura: MAGAZINE_LUIZA_PAGE_TIMEOUT vale por página
+        self.session = get_session("magalu", read_retries=0)
+        # O Chrome é compartilhado entre ciclos e scrapers: aqui só se pega a referência
+        self.browser = get_browser_manager(session_path)
+        self.driver = None
 
     def fetch_deals(self):
-        """Acessa a lista e coleta os dados básicos dos 3 primeiros produtos."""
+        """Coleta os produtos da categoria de uma vez (ver iter_deals)."""
+        return list(self.iter_deals())
+
+    def iter_deals(self):
+        """
+        Entrega os produtos da categoria conforme ficam prontos. Nos modos 'auto'
+        e 'http' a listagem e as páginas de produto são baixadas via HTTP; no modo
+        'auto' o Chrome compartilhado só é aberto se o site responder com um
+        desafio anti-bot. No navegador a coleta é concluída antes de entregar os
+        produtos, para não segurar a aba compartilhada durante a postagem.
+        """
+        if self.is_cancelled():
+            return
+        if self.mode in ("auto", "http"):
+            candidatos = self._http_candidates()
+            if candidatos is not None:
+                yield from self._iter_enriched(candidatos)
+                return
+            if self.mode == "http" or uc is None:
+                print(">>> [Magalu] Listagem indisponível via HTTP. Nenhuma oferta coletada neste ciclo.")
+                return
+            print(">>> [Magalu] Desafio anti-bot detectado. Usando o navegador...")
+
+        # Outras categorias podem estar usando o Chrome: se o prazo acabar na
+        # espera, a aba não é aberta (nem o Chrome reiniciado após o cancel())
+        with self.browser.tab(cancelled=self.is_cancelled) as driver:
+            if driver is None:
+                return
+            self.driver = driver
+            try:
+                produtos = self._collect_deals()
+            finally:
+                self.driver = None
+        yield from produtos
+
+    def _collect_deals(self):
+        """Coleta os dados básicos dos primeiros produtos e os enriquece (imagem HQ e cupom)."""
         print(f">>> Acessando: {self.url}")
         self.driver.get(self.url)
         
         wait = WebDriverWait(self.driver, 15)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="product-card-container"]')))
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR)))
         time.sleep(2)
+        self.browser.log_page(self.driver, "Listagem Magalu:")
+
+        candidatos = self._read_cards_script()
+        if candidatos is None:
+            candidatos = self._read_cards_webdriver()
+
+        return self._enrich(candidatos)
+
+    def _http_candidates(self):
+        """
+        Baixa e lê a listagem via HTTP.
+
+        Returns:
+            list: Candidatos inéditos ou None se a página foi bloqueada ou veio sem cards.
+        """
+        print(f">>> Acessando (HTTP): {self.url}")
+        try:
+            resp = self.session.get(self.url, headers=self.headers, timeout=self.page_timeout)
+        except Exception as e:
+            print(f"   [Aviso] Falha ao baixar a listagem: {e}")
+            return None
+        if resp.status_code != 200 or is_challenge(resp.status_code, resp.text):
+            print(f"   [Aviso] Listagem bloqueada (HTTP {resp.status_code}).")
+            return None
+        cards = parse_listing_html(resp.text, self.url)
+        if not cards:
+            print("   [Aviso] Nenhum card encontrado no HTML da listagem.")
+            return None
+        return self._select_candidates(cards)
+
+    def _fetch_product_details(self, link):
+        """Baixa a página do produto via HTTP. Retorna None se falhar ou cair em desafio anti-bot."""
+        try:
+            resp = self.session.get(link, headers=self.headers, timeout=self.page_timeout)
+            if resp.status_code != 200 or is_challenge(resp.status_code, resp.text):
+                return None
+            return parse_product_page(resp.text)
+        except Exception as e:
+            print(f"   [Aviso] Falha ao baixar página do produto: {e}")
+            return None
+
+    def _enrich(self, candidatos):
+        """Completa todos os candidatos com imagem HQ e cupom (ver _iter_enriched)."""
+        return list(self._iter_enriched(candidatos))
+
+    def _iter_enriched(self, candidatos):
+        """
+        Completa os candidatos com imagem HQ e cupom, entregando cada um assim que
+        fica pronto. A imagem HQ vem da própria URL da miniatura quando ela segue
+        o padrão do CDN. As páginas de produto (necessárias para o cupom) são
+        baixadas em paralelo via HTTP; só as que falharem são abertas no
+        navegador, todas de uma vez em abas.
+        """
+        for item in candidatos:
+            item['cupom_codigo'] = None
+            item['cupom_desconto'] = None
+            item['imagem_hq'] = False
+            upgraded = hq_image_url(item.get('imagem'), self.image_size)
+            if upgraded and upgraded != item.get('imagem'):
+                item['imagem'] = upgraded
+                item['imagem_hq'] = True
+        if not candidatos:
+            return
+
+        print(f"   >>> Enriquecendo {len(candidatos)} produto(s) em paralelo (imagem HQ e cupom)...")
+        pendentes = []
+        workers = min(self.workers, len(candidatos))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="magalu-pages")
+        try:
+            futures = {executor.submit(self._fetch_product_details, item['link']): item for item in candidatos}
+            # Cada página tem seu timeout; o total é limitado pelo número de rodadas do pool
+            rounds = -(-len(candidatos) // workers)
+            remaining = set(futures)
+            try:
+                for future in as_completed(futures, timeout=self.page_timeout * rounds + 5):
+                    remaining.discard(future)
+                    item = futures[future]
+                    details = future.result()
+                    if details is None:
+                        pendentes.append(item)
+                        continue
+                    self._apply_details(item, details)
+                    item.pop('imagem_hq', None)
+                    yield item
+            except FuturesTimeoutError:
+                pendentes.extend(futures[future] for future in remaining)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if pendentes and self.driver is not None and not self.is_cancelled():
+            print(f"   >>> {len(pendentes)} página(s) sem resposta via HTTP. Abrindo no navegador...")
+            self._enrich_in_tabs(pendentes)
 
-        cards = self.driver.find_elements(By.CSS_SELECTOR, '[data-testid="product-card-container"]')
+        for item in pendentes:
+            item.pop('imagem_hq', None)
+            yield item
+
+    def _apply_details(self, item, details):
+        if details.get("imagem") and not item['imagem_hq']:
+            item['imagem'] = details["imagem"]
+        if details.get("cupom_codigo"):
+            item['cupom_codigo'] = details["cupom_codigo"]
+            item['cupom_desconto'] = details.get("cupom_desconto")
+            print(f"   [Cupom Encontrado] Codigo: {item['cupom_codigo']}, Desconto: {item['cupom_desconto']}")
+
+    def _enrich_in_tabs(self, items):
+        """
+        Abre todas as páginas pendentes em abas de uma vez (o Chrome as carrega em
+        paralelo) e depois lê cada aba, respeitando o tempo máximo por página.
+        """
+        driver = self.driver
+        origin = driver.current_window_handle
+        before = set(driver.window_handles)
+        handles = []
+        for item in items:
+            handle = None
+            try:
+                # Abre em branco para aplicar o modo enxuto (CDP) antes de a página carregar;
+                # a navegação via location não espera o load, então as abas carregam em paralelo
+                driver.execute_script("window.open('about:blank', '_blank');")
+                opened = [h for h in driver.window_handles if h not in before and h not in handles]
+                handle = opened[0] if opened else None
+                if handle is not None:
+                    driver.switch_to.window(handle)
+                    self.browser.prepare_tab(driver)
+                    driver.execute_script("window.location.href = arguments[0];", item['link'])
+            except Exception as e:
+                print(f"   [Aviso] Falha ao abrir aba do produto: {e}")
+            handles.append(handle)
+
+        for item, handle in zip(items, handles):
+            if handle is None or self.is_cancelled():
+                continue
+            try:
+                driver.switch_to.window(handle)
+                try:
+                    WebDriverWait(driver, self.page_timeout).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="image-selected-thumbnail"]'))
+                    )
+                except TimeoutException:
+                    pass
+                self._apply_details(item, parse_product_page(driver.page_source))
+            except Exception as e:
+                print(f"   [Aviso] Falha ao ler página de {item['titulo'][:30]}: {e}")
+            finally:
+                try:
+                    driver.close()
+                except Exception:
+                    pass
+        driver.switch_to.window(origin)
+
+    def _read_cards_script(self):
+        """
+        Extrai os cards da listagem com um único execute_script.
+
+        Returns:
+            list: Candidatos inéditos (até o limite) ou None se a extração falhar.
+        """
+        try:
+            cards = self.driver.execute_script(EXTRACT_CARDS_JS, CARD_SELECTOR)
+        except Exception as e:
+            print(f"   [Aviso] Extração via script falhou, usando WebDriver: {e}")
+            return None
+        if not cards:
+            return None
+
+        return self._select_candidates(cards)
+
+    def _select_candidates(self, cards):
+        """Filtra os cards já postados e monta os candidatos (até o limite)."""
+        # Histórico de preços: registra todos os cards lidos, inclusive os já postados
+        record_prices(cards)
+        existing = deals_exist_many([card.get("link") for card in cards])
+        candidatos = []
+        with self.seen_lock:
+            for card in cards:
+                if len(candidatos) >= self.limit:
+                    break
+                link_original = card.get("link")
+                if not link_original or link_original in existing:
+                    continue
+                # O mesmo produto pode aparecer em outra categoria com outros parâmetros no link
+                key = deal_key(link_original) or link_original
+                if key in self.seen:
+                    continue
+                if not card.get("titulo") or not card.get("preco"):
+                    continue
+                candidatos.append({
+                    "titulo": card["titulo"],
+                    "preco": card["preco"],
+                    "preco_original": card.get("preco_original", ""),
+                    "parcelamento": card.get("parcelamento", ""),
+                    "desconto_pix": card.get("desconto_pix", ""),
+                    "link": link_original,
+                    "link_original": link_original,
+                    "imagem": card.get("imagem")
+                })
+                self.seen.add(key)
+                print(f"   [Candidato] {card['titulo'][:30]}...")
+        return candidatos
+
+    def _read_cards_webdriver(self):
+        """Caminho alternativo: lê os cards elemento por elemento pelo WebDriver."""
+        cards = self.driver.find_elements(By.CSS_SELECTOR, CARD_SELECTOR)
+
+        # Lê os links de todos os cards e verifica duplicatas com uma única consulta
+        card_links = []
+        for card in cards:
+            try:
+                card_links.append(card.get_attribute("href"))
+            except Exception:
+                card_links.append(None)
+        existing = deals_exist_many(card_links)
 
         candidatos = []
         collected_count = 0
@@ -97,9 +480,13 @@ class MagazineLuizaScraper(BaseScraper):
             if collected_count >= self.limit:
                 break
             try:
-                link_original = card.get_attribute("href")
-                if deal_exists(link_original):
+                link_original = card_links[i]
+                if not link_original or link_original in existing:
                     continue
+                key = deal_key(link_original) or link_original
+                with self.seen_lock:
+                    if key in self.seen:
+                        continue
 
                 titulo = card.find_element(By.CSS_SELECTOR, '[data-testid="product-title"]').text
                 preco = card.find_element(By.CSS_SELECTOR, '[data-testid="price-value"]').text
@@ -137,50 +524,98 @@ class MagazineLuizaScraper(BaseScraper):
                     "parcelamento": parcelamento,
                     "desconto_pix": desconto_pix,
                     "link": link_original,
+                    "link_original": link_original,
                     "imagem": imagem
                 })
+                with self.seen_lock:
+                    self.seen.add(key)
                 print(f"   [Candidato] {titulo[:30]}...")
                 collected_count += 1
             except Exception as e:
                 print(f"   [Erro ao ler card {i}]: {e}")
                 continue
+        # Neste caminho só os candidatos são lidos por completo
+        record_prices(candidatos)
+        return candidatos
 
-        produtos = []
-        for item in candidatos:
-            try:
-                print(f"   >>> Obtendo imagem HQ de: {item['titulo'][:30]}...")
-                self.driver.get(item['link'])
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="image-selected-thumbnail"]')))
-                img_hq = self.driver.find_element(By.CSS_SELECTOR, '[data-testid="image-selected-thumbnail"]')
-                if img_hq.get_attribute("src"):
-                    item['imagem'] = img_hq.get_attribute("src")
-            except Exception as e:
-                print(f"   [Aviso] Falha ao obter imagem HQ: {e}")
-            
-            # Extrair cupom se existir
-            item['cupom_codigo'] = None
-            item['cupom_desconto'] = None
-            try:
-                coupon_inputs = self.driver.find_elements(By.CSS_SELECTOR, 'input[data-testid="coupon-code-input"]')
-                if coupon_inputs:
-                    item['cupom_codigo'] = coupon_inputs[0].get_attribute("value")
-                    try:
-                        coupon_copy_elem = self.driver.find_element(By.CSS_SELECTOR, '[data-testid="coupon-code-copy"]')
-                        strong_elem = coupon_copy_elem.find_element(By.TAG_NAME, 'strong')
-                        item['cupom_desconto'] = strong_elem.text
-                    except Exception as e_desc:
-                        pass
-                    print(f"   [Cupom Encontrado] Codigo: {item['cupom_codigo']}, Desconto: {item['cupom_desconto']}")
-            except Exception as e_cupom:
-                print(f"   [Aviso] Falha ao obter cupom: {e_cupom}")
-            
-            produtos.append(item)
-            time.sleep(1)
-
-        return produtos
+    def cancel(self):
+        """
+        Além da interrupção cooperativa, derruba o Chrome compartilhado se esta
+        instância estiver usando uma aba: um navegador travado não responde aos
+        laços de busca, e encerrá-lo libera a chamada bloqueada no WebDriver.
+        O Chrome é reiniciado no próximo uso.
+        """
+        super().cancel()
+        if self.driver is not None:
+            print(">>> [Magalu] Prazo esgotado com o navegador em uso. Reiniciando o Chrome...")
+            self.browser.kill()
+
+    def close(self):
+        """
+        O navegador é compartilhado e continua aquecido para o próximo ciclo;
+        ele é fechado no encerramento do processo (utils.browser_manager).
+        """
+        pass
+
+class MagazineLuizaCategoriesScraper(BaseScraper):
+    """
+    Varre todas as categorias do Magazine Luiza no mesmo ciclo, em paralelo.
+    Cada categoria tem sua própria cota ('limit') e as categorias compartilham
+    o conjunto de links do ciclo, então um produto listado em duas delas só é
+    coletado uma vez. No modo HTTP as categorias rodam de fato em paralelo; no
+    navegador as abas se revezam no Chrome compartilhado.
+    """
+    def __init__(self, urls, session_path, limit=3, workers=None):
+        self.seen = set()
+        self.seen_lock = threading.Lock()
+        self.scrapers = [
+            MagazineLuizaScraper(url, session_path, limit=limit, seen=self.seen, seen_lock=self.seen_lock)
+            for url in urls
+        ]
+        try:
+            self.workers = int(workers or os.getenv("MAGAZINE_LUIZA_CATEGORY_WORKERS", len(urls) or 1))
+        except (ValueError, TypeError):
+            self.workers = len(urls) or 1
+        self.workers = max(self.workers, 1)
+
+    def fetch_deals(self):
+        return list(self.iter_deals())
+
+    def iter_deals(self):
+        """Entrega as ofertas de cada categoria assim que ela termina."""
+        if not self.scrapers:
+            return
+        print(f">>> [Magalu] Varrendo {len(self.scrapers)} categorias em paralelo...")
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="magalu-categories")
+        try:
+            futures = {executor.submit(self._fetch_category, scraper): scraper for scraper in self.scrapers}
+            for future in as_completed(futures):
+                scraper = futures[future]
+                try:
+                    novos = future.result() or []
+                    print(f"   [Magalu] {len(novos)} oferta(s) em {scraper.url}")
+                except Exception as e:
+                    print(f"   [Erro Magalu] Falha na categoria {scraper.url}: {e}")
+                    continue
+                yield from novos
+                if self.is_cancelled():
+                    break
+        finally:
+            # Não espera as categorias restantes se o consumidor parar antes (ex: prazo esgotado)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_category(self, scraper):
+        try:
+            return scraper.fetch_deals()
+        finally:
+            # As threads do pool são criadas a cada ciclo: a conexão com o banco volta ao pool
+            release_connection()
+
+    def cancel(self):
+        super().cancel()
+        for scraper in self.scrapers:
+            scraper.cancel()
 
     def close(self):
-        """Fecha o navegador."""
-        if self.driver:
-            self.driver.quit()
-            print(">>> Navegador fechado.")
+        for scraper in self.scrapers:
+            scraper.close()
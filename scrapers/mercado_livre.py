@@ -4,24 +4,126 @@ import sys
 import random
 import requests
 import re
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 try:
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, SoupStrainer
+    import soupsieve
 except ImportError:
     BeautifulSoup = None
 
 from .base_scraper import BaseScraper
-from database.database import deal_exists
+from utils.http import get_session
+from utils.html import HTML_PARSER
+from database.database import deals_exist_many
+from database.price_history import record_prices
+from database.affiliate_cache import get_cached_affiliate_links, save_affiliate_links, invalidate_affiliate_links
+from utils.ml_affiliate_session import SessionExpired, create_links_http, save_session_from_driver, clear_session
+
+# Regexes e seletores compilados uma unica vez por processo
+PDP_FILTERS_RE = re.compile(r'pdp_filters=([^&#]*)')
+LOWRES_IMAGE_RE = re.compile(r'-[IVX]\.(jpg|png|gif|webp|jpeg)$', re.IGNORECASE)
+# Inicio da tag de abertura de cada card (usado para fatiar o HTML sem montar a arvore inteira)
+CARD_START_RE = re.compile(r'<[a-zA-Z]+\b[^<>]*?\bclass="poly-card(?:\s[^"]*)?"')
+# Tamanho maximo do trecho de HTML do ultimo card (evita parsear o rodape da pagina)
+MAX_CARD_CHARS = 40000
+# Quantidade de cards verificados no banco por consulta
+CARD_BATCH_SIZE = 12
+# Ultima pagina de ofertas considerada no sorteio
+MAX_OFFERS_PAGE = 15
+
+# Script executado na pagina do Link Builder: converte uma lista de URLs com uma unica chamada
+CREATE_LINK_JS = """
+const callback = arguments[arguments.length - 1];
+const urls = arguments[0];
+const affiliateTag = arguments[1];
+
+const csrfMeta = document.querySelector('meta[name="csrf-token"]');
+const csrfToken = csrfMeta ? csrfMeta.getAttribute('content') : '';
+
+fetch('/affiliate-program/api/v2/affiliates/createLink', {
+    method: 'POST',
+    headers: {
+        'content-type': 'application/json',
+        'x-csrf-token': csrfToken
+    },
+    body: JSON.stringify({
+        urls: urls,
+        tag: affiliateTag
+    })
+})
+.then(async res => {
+    const text = await res.text();
+    return {status: res.status, text: text};
+})
+.then(result => callback(result))
+.catch(err => callback({error: err.toString()}));
+"""
+
+if BeautifulSoup is not None:
+    # Regex para casar 'poly-card' como uma das classes (e nao 'poly-card__content' etc.)
+    CARD_STRAINER = SoupStrainer(class_=re.compile(r'(?:^|\s)poly-card(?:\s|$)'))
+    SEL_TITLE = soupsieve.compile("a.poly-component__title")
+    SEL_PRICE = soupsieve.compile("div.poly-price__current .andes-money-amount")
+    SEL_ORIGINAL_PRICE = soupsieve.compile("s.andes-money-amount--previous")
+    SEL_FRACTION = soupsieve.compile(".andes-money-amount__fraction")
+    SEL_CENTS = soupsieve.compile(".andes-money-amount__cents")
+    SEL_INSTALLMENTS = soupsieve.compile(".poly-price__installments")
+    SEL_DISCOUNT = soupsieve.compile(".andes-money-amount__discount")
+    SEL_IMAGE = soupsieve.compile("img.poly-component__picture")
+    SEL_COUPON = soupsieve.compile(".poly-coupons__pill")
+
+def iter_cards(html):
+    """
+    Gera os cards 'poly-card' da pagina de ofertas um a um.
+    O HTML e fatiado no inicio de cada card e cada fatia e parseada isoladamente
+    (restrita aos subtrees 'poly-card' via SoupStrainer), entao quem consome o
+    gerador pode parar assim que tiver cards suficientes sem parsear o resto
+    da pagina. Se o fatiamento nao encontrar cards, parseia a pagina inteira.
+    """
+    starts = [m.start() for m in CARD_START_RE.finditer(html)]
+    if not starts:
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=CARD_STRAINER)
+        yield from soup.find_all(class_="poly-card")
+        return
+
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else min(len(html), start + MAX_CARD_CHARS)
+        soup = BeautifulSoup(html[start:end], HTML_PARSER, parse_only=CARD_STRAINER)
+        card = soup.find(class_="poly-card")
+        if card is not None:
+            yield card
+
+def _money_text(elem):
+    """Monta 'R$ 1.234,56' a partir de um elemento andes-money-amount."""
+    frac = SEL_FRACTION.select_one(elem)
+    if not frac:
+        return ""
+    text = f"R$ {frac.text.strip()}"
+    cents = SEL_CENTS.select_one(elem)
+    if cents:
+        text += f",{cents.text.strip()}"
+    return text
 
 class MercadoLivreScraper(BaseScraper):
     """
     Scraper para capturar ofertas do dia do Mercado Livre.
     Utiliza BeautifulSoup e rotaciona as paginas de ofertas para obter produtos variados.
     """
-    def __init__(self, url=None, limit=5):
+    def __init__(self, url=None, limit=5, pages=None, workers=None):
         if BeautifulSoup is None:
             print(">>> beautifulsoup4 nao instalado. Execute: pip install beautifulsoup4")
             sys.exit(1)
         self.limit = limit
+        # Quantidade de paginas de ofertas buscadas por ciclo (1 = uma pagina sorteada)
+        # e quantidade maxima de downloads simultaneos
+        try:
+            self.pages = int(pages or os.getenv("MERCADO_LIVRE_PAGES", 1))
+            self.workers = int(workers or os.getenv("MERCADO_LIVRE_WORKERS", 4))
+        except (ValueError, TypeError):
+            self.pages, self.workers = 1, 4
+        self.pages = min(max(self.pages, 1), MAX_OFFERS_PAGE)
+        self.workers = max(self.workers, 1)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
         }
@@ -42,136 +144,207 @@ class MercadoLivreScraper(BaseScraper):
             text = text[3:].strip()
         return text
 
-    def fetch_deals(self):
+    def _normalize_link(self, link):
+        """Remove parametros de rastreamento do link, preservando apenas o pdp_filters."""
+        if "pdp_filters=" in link:
+            match = PDP_FILTERS_RE.search(link)
+            if match:
+                pdp_filters = match.group(0)
+                base_url = link.split("?")[0]
+                return f"{base_url}?{pdp_filters}"
+            return link.split("?")[0]
+        if "?" in link:
+            return link.split("?")[0]
+        return link
+
+    def _parse_card(self, card, link_elem, link):
+        """Extrai os dados de um card ja validado (link presente e nao duplicado)."""
+        titulo = link_elem.text.strip()
+
+        # Preco Atual
+        preco_elem = SEL_PRICE.select_one(card)
+        preco = _money_text(preco_elem) if preco_elem else ""
+        if not preco:
+            return None
+
+        # Preco Original
+        preco_original_elem = SEL_ORIGINAL_PRICE.select_one(card)
+        preco_original = _money_text(preco_original_elem) if preco_original_elem else ""
+
+        # Parcelamento
+        parcelamento = ""
+        parcelamento_elem = SEL_INSTALLMENTS.select_one(card)
+        if parcelamento_elem:
+            parcelamento = self._clean_installments(parcelamento_elem.text)
+
+        # Desconto (Pix / OFF)
+        desconto_msg = ""
+        desconto_elem = SEL_DISCOUNT.select_one(card)
+        if desconto_elem:
+            desconto_msg = desconto_elem.text.strip()
+
+        # Imagem
+        img_elem = SEL_IMAGE.select_one(card)
+        imagem = None
+        if img_elem:
+            imagem = img_elem.get('src') or img_elem.get('data-src')
+            if imagem:
+                # Substitui sufixos comuns de baixa resolucao por alta resolucao
+                imagem = LOWRES_IMAGE_RE.sub(r'-O.\1', imagem)
+                if imagem.startswith("http://"):
+                    imagem = imagem.replace("http://", "https://", 1)
+
+        # Cupom se houver no card
+        cupom_desconto = None
+        coupon_elem = SEL_COUPON.select_one(card)
+        if coupon_elem:
+            txt = coupon_elem.text.strip()
+            if txt.lower().startswith("cupom "):
+                cupom_desconto = txt[6:].strip()
+            else:
+                cupom_desconto = txt
+            print(f"   [Cupom ML Encontrado] Desconto: {cupom_desconto}")
+
+        return {
+            "titulo": titulo,
+            "preco": preco,
+            "preco_original": preco_original,
+            "parcelamento": parcelamento,
+            "desconto_pix": desconto_msg,
+            "link": link,
+            "link_original": link,
+            "imagem": imagem,
+            "cupom_codigo": None,
+            "cupom_desconto": cupom_desconto
+        }
+
+    def _price_observations(self, batch):
+        """Le apenas os precos dos cards de um lote (para o historico de precos)."""
+        observations = []
+        for card, _, link in batch:
+            preco_elem = SEL_PRICE.select_one(card)
+            preco_original_elem = SEL_ORIGINAL_PRICE.select_one(card)
+            observations.append({
+                "link_original": link,
+                "preco": _money_text(preco_elem) if preco_elem else "",
+                "preco_original": _money_text(preco_original_elem) if preco_original_elem else ""
+            })
+        return observations
+
+    def parse_listing(self, html, limit=None, existing_links=deals_exist_many, price_recorder=record_prices):
         """
-        Coleta ofertas do dia do Mercado Livre.
-        Rotaciona a pagina (1 a 15) para garantir ofertas frescas.
+        Extrai ate 'limit' ofertas nao duplicadas do HTML da pagina de ofertas.
+        Os cards sao lidos em lotes: os links de cada lote sao verificados no banco
+        com uma unica consulta e a leitura para assim que o limite e atingido.
+
+        Args:
+            html (str): HTML da pagina de ofertas.
+            limit (int): Quantidade de ofertas desejada (padrao: self.limit).
+            existing_links (callable): Recebe uma lista de links e retorna o conjunto dos ja registrados.
+            price_recorder (callable): Grava os precos de cada lote no historico (padrao: record_prices).
         """
-        # Sorteia uma pagina entre 1 e 15
-        page = random.randint(1, 15)
+        limit = self.limit if limit is None else limit
+        produtos = []
+        cards = iter_cards(html)
+        found_cards = False
+        while len(produtos) < limit:
+            batch = []
+            for card in cards:
+                found_cards = True
+                link_elem = SEL_TITLE.select_one(card)
+                if not link_elem or not link_elem.get('href'):
+                    continue
+                batch.append((card, link_elem, self._normalize_link(link_elem['href'])))
+                if len(batch) >= CARD_BATCH_SIZE:
+                    break
+            if not batch:
+                break
+
+            existing = existing_links([link for _, _, link in batch])
+            for i, (card, link_elem, link) in enumerate(batch):
+                if len(produtos) >= limit:
+                    break
+                if link in existing:
+                    continue
+                try:
+                    produto = self._parse_card(card, link_elem, link)
+                except Exception as e:
+                    print(f"   [Erro ao ler card {i} do Mercado Livre]: {e}")
+                    continue
+                if produto:
+                    produtos.append(produto)
+                    print(f"   [Coletado ML] {produto['titulo'][:30]}...")
+
+            # Historico de precos: registra todos os cards do lote, inclusive os ja postados
+            price_recorder(self._price_observations(batch))
+
+        if not found_cards:
+            print("   [Aviso] Nenhum card 'poly-card' encontrado. A estrutura do site pode ter mudado.")
+        return produtos
+
+    def _fetch_page(self, page):
+        """Baixa uma pagina de ofertas e retorna o HTML (ou None em caso de erro)."""
         url = f"https://www.mercadolivre.com.br/ofertas?page={page}"
         print(f">>> Acessando ofertas do Mercado Livre (Pagina {page}): {url}")
-        
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = get_session().get(url, headers=self.headers, timeout=15)
             response.raise_for_status()
+            return response.text
         except requests.RequestException as e:
-            print(f"   [Erro ao acessar URL do Mercado Livre]: {e}")
-            return []
+            print(f"   [Erro ao acessar URL do Mercado Livre (Pagina {page})]: {e}")
+            return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        cards = soup.find_all(class_='poly-card')
-        
-        if not cards:
-            print("   [Aviso] Nenhum card 'poly-card' encontrado. A estrutura do site pode ter mudado.")
-            return []
+    def _sweep_pages(self):
+        """
+        Busca varias paginas de ofertas ao mesmo tempo (pool limitado de threads),
+        junta os cards sem repetir produtos entre as paginas e para assim que
+        'limit' ofertas novas forem encontradas, cancelando os downloads pendentes.
+        """
+        pages = random.sample(range(1, MAX_OFFERS_PAGE + 1), self.pages)
+        print(f">>> [Mercado Livre] Varrendo {len(pages)} paginas em paralelo: {sorted(pages)}")
 
         produtos = []
-        collected_count = 0
-        
-        for i, card in enumerate(cards):
-            if collected_count >= self.limit:
-                break
-            try:
-                # Titulo e Link
-                link_elem = card.find('a', class_='poly-component__title')
-                if not link_elem or not link_elem.get('href'):
-                    continue
-                link = link_elem['href']
-                if "pdp_filters=" in link:
-                    match = re.search(r'pdp_filters=([^&#]*)', link)
-                    if match:
-                        pdp_filters = match.group(0)
-                        base_url = link.split("?")[0]
-                        link = f"{base_url}?{pdp_filters}"
-                    else:
-                        link = link.split("?")[0]
-                elif "?" in link:
-                    link = link.split("?")[0]
-                    
-                if deal_exists(link):
-                    continue
+        seen_links = set()
 
-                titulo = link_elem.text.strip()
-
-                # Preco Atual
-                preco = ""
-                preco_container = card.find('div', class_='poly-price__current')
-                if preco_container:
-                    preco_elem = preco_container.find(class_='andes-money-amount')
-                    if preco_elem:
-                        frac = preco_elem.find(class_='andes-money-amount__fraction')
-                        cents = preco_elem.find(class_='andes-money-amount__cents')
-                        preco = f"R$ {frac.text.strip()}" if frac else ""
-                        if cents:
-                            preco += f",{cents.text.strip()}"
-                
-                if not preco:
+        def existing_links(links):
+            return deals_exist_many(links) | {link for link in links if link in seen_links}
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ml-pages")
+        try:
+            futures = [executor.submit(self._fetch_page, page) for page in pages]
+            for future in as_completed(futures):
+                html = future.result()
+                if not html:
                     continue
+                novos = self.parse_listing(html, self.limit - len(produtos), existing_links)
+                for produto in novos:
+                    seen_links.add(produto["link"])
+                produtos.extend(novos)
+                if len(produtos) >= self.limit:
+                    print(f">>> [Mercado Livre] {len(produtos)} ofertas novas encontradas. Cancelando paginas restantes.")
+                    break
+                if self.is_cancelled():
+                    print(">>> [Mercado Livre] Prazo esgotado. Cancelando paginas restantes.")
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return produtos
+
+    def fetch_deals(self):
+        """
+        Coleta ofertas do dia do Mercado Livre.
+        Rotaciona a pagina (1 a 15) para garantir ofertas frescas. Com
+        MERCADO_LIVRE_PAGES > 1, varre varias paginas sorteadas em paralelo.
+        """
+        if self.pages > 1:
+            produtos = self._sweep_pages()
+        else:
+            # Sorteia uma pagina entre 1 e 15
+            html = self._fetch_page(random.randint(1, MAX_OFFERS_PAGE))
+            if not html:
+                return []
+            produtos = self.parse_listing(html)
 
-                # Preco Original
-                preco_original = ""
-                preco_original_elem = card.find('s', class_='andes-money-amount--previous')
-                if preco_original_elem:
-                    frac_old = preco_original_elem.find(class_='andes-money-amount__fraction')
-                    cents_old = preco_original_elem.find(class_='andes-money-amount__cents')
-                    preco_original = f"R$ {frac_old.text.strip()}" if frac_old else ""
-                    if cents_old:
-                        preco_original += f",{cents_old.text.strip()}"
-
-                # Parcelamento
-                parcelamento = ""
-                parcelamento_elem = card.find(class_='poly-price__installments')
-                if parcelamento_elem:
-                    parcelamento = self._clean_installments(parcelamento_elem.text)
-
-                # Desconto (Pix / OFF)
-                desconto_msg = ""
-                desconto_elem = card.find(class_='andes-money-amount__discount')
-                if desconto_elem:
-                    desconto_msg = desconto_elem.text.strip()
-
-                # Imagem
-                img_elem = card.find('img', class_='poly-component__picture')
-                imagem = None
-                if img_elem:
-                    imagem = img_elem.get('src') or img_elem.get('data-src')
-                    if imagem:
-                        # Substitui sufixos comuns de baixa resolucao por alta resolucao
-                        imagem = re.sub(r'-[IVX]\.(jpg|png|gif|webp|jpeg)$', r'-O.\1', imagem, flags=re.IGNORECASE)
-                        if imagem.startswith("http://"):
-                            imagem = imagem.replace("http://", "https://", 1)
-
-                # Cupom se houver no card
-                cupom_desconto = None
-                try:
-                    coupon_elem = card.find(class_='poly-coupons__pill')
-                    if coupon_elem:
-                        txt = coupon_elem.text.strip()
-                        if txt.lower().startswith("cupom "):
-                            cupom_desconto = txt[6:].strip()
-                        else:
-                            cupom_desconto = txt
-                        print(f"   [Cupom ML Encontrado] Desconto: {cupom_desconto}")
-                except Exception:
-                    pass
-
-                produtos.append({
-                    "titulo": titulo,
-                    "preco": preco,
-                    "preco_original": preco_original,
-                    "parcelamento": parcelamento,
-                    "desconto_pix": desconto_msg,
-                    "link": link,
-                    "imagem": imagem,
-                    "cupom_codigo": None,
-                    "cupom_desconto": cupom_desconto
-                })
-                print(f"   [Coletado ML] {titulo[:30]}...")
-                collected_count += 1
-            except Exception as e:
-                print(f"   [Erro ao ler card {i} do Mercado Livre]: {e}")
-                continue
         # Converte os links normais coletados em links de afiliados do Mercado Livre
         if produtos:
             try:
@@ -181,115 +354,148 @@ class MercadoLivreScraper(BaseScraper):
                 
         return produtos
 
+    def _apply_affiliate_response(self, chunk, status, text, tag):
+        """
+        Aplica a resposta do createLink a um lote de ofertas (na mesma ordem das URLs enviadas).
+        Links gerados vao para o cache; produtos com falha sao invalidados no cache.
+        """
+        if status != 200:
+            print(f"   [Erro ML Affiliate] HTTP {status} ao tentar gerar {len(chunk)} link(s).")
+            return
+        res_data = json.loads(text)
+        url_infos = res_data.get("urls") or []
+        converted = []
+        failed = []
+        for deal, url_info in zip(chunk, url_infos):
+            short_link = url_info.get("short_url")
+            long_link = url_info.get("long_url")
+            if short_link or long_link:
+                deal["link"] = short_link or long_link
+                converted.append((deal["link_original"], deal["link"]))
+                print(f"   [Sucesso ML Affiliate] {deal['titulo'][:30]}... -> {deal['link'][:50]}")
+            else:
+                failed.append(deal["link_original"])
+                print(f"   [Erro ML Affiliate] Falha na API para '{deal['titulo'][:30]}': {url_info.get('message', 'Erro retornado pela API')}")
+        failed.extend(deal["link_original"] for deal in chunk[len(url_infos):])
+        save_affiliate_links(converted, tag)
+        if failed:
+            invalidate_affiliate_links(failed, tag)
+
+    def _convert_via_http(self, pending, tag, batch_size):
+        """
+        Converte os links pelo createLink via HTTP com os cookies/CSRF salvos.
+        Retorna as ofertas que ainda precisam do navegador (todas, se a sessao
+        estiver ausente ou expirada).
+        """
+        for start in range(0, len(pending), batch_size):
+            if self.is_cancelled():
+                break
+            chunk = pending[start:start + batch_size]
+            try:
+                print(f">>> [ML Affiliate] Gerando {len(chunk)} link(s) de afiliado via HTTP (sem navegador)...")
+                status, text = create_links_http([deal["link_original"] for deal in chunk], tag)
+                self._apply_affiliate_response(chunk, status, text, tag)
+            except SessionExpired as e:
+                print(f">>> [ML Affiliate] Sessao do Link Builder invalida: {e}")
+                clear_session()
+                return pending[start:]
+            except Exception as e:
+                print(f"   [Erro ML Affiliate] Falha ao processar lote via HTTP: {e}")
+        return []
+
     def _convert_links_to_affiliate(self, deals):
         """
-        Abre o navegador Chrome com a sessao persistida do usuario e
-        converte os links originais em links de afiliados via JS Fetch.
+        Converte os links originais em links de afiliados.
+        Primeiro reaproveita os links do cache persistente (por produto e tag);
+        so abre o navegador se sobrar algum produto sem link, e converte todos
+        eles em poucas chamadas ao createLink (lotes de ML_AFFILIATE_BATCH_SIZE URLs).
         """
         if not deals:
             return deals
-            
+
+        tag = os.getenv("MERCADO_LIVRE_AFFILIATE_TAG", "fs20251223173450")
         try:
-            import undetected_chromedriver as uc
-        except ImportError:
-            print(">>> [ML Affiliate] undetected_chromedriver nao instalado. Mantendo links originais.")
+            ttl_hours = float(os.getenv("ML_AFFILIATE_CACHE_HOURS", 72))
+            batch_size = max(int(os.getenv("ML_AFFILIATE_BATCH_SIZE", 20)), 1)
+        except ValueError:
+            ttl_hours, batch_size = 72, 20
+
+        for deal in deals:
+            deal.setdefault("link_original", deal["link"])
+        cached = get_cached_affiliate_links([deal["link_original"] for deal in deals], tag, ttl_hours)
+        pending = []
+        for deal in deals:
+            if deal["link_original"] in cached:
+                deal["link"] = cached[deal["link_original"]]
+                print(f"   [Cache ML Affiliate] {deal['titulo'][:30]}... -> {deal['link']}")
+            else:
+                pending.append(deal)
+        if not pending:
+            print(">>> [ML Affiliate] Todos os links de afiliado vieram do cache.")
             return deals
+
+        # Modo sem navegador: reaproveita a sessao salva e chama o createLink via HTTP
+        mode = os.getenv("ML_AFFILIATE_MODE", "auto").lower()
+        if mode in ("auto", "http"):
+            pending = self._convert_via_http(pending, tag, batch_size)
+            if not pending:
+                return deals
+            if mode == "http":
+                print(">>> [ML Affiliate] Modo HTTP: sessao indisponivel, mantendo links originais dos restantes.")
+                return deals
+            print(f">>> [ML Affiliate] Sessao expirada ou ausente. Usando o navegador para {len(pending)} link(s).")
             
-        from .magazine_luiza import get_chrome_main_version
-        
+        from utils.browser_manager import get_browser_manager, uc
+        if uc is None:
+            print(">>> [ML Affiliate] undetected_chromedriver nao instalado. Mantendo links originais.")
+            return deals
+
+        # Usa uma aba do Chrome compartilhado (mesmo perfil do Magalu), sem abrir outro navegador.
+        # Como o ML possui forte deteccao headless (403), o navegador compartilhado nao usa --headless.
         session_path = os.path.join(os.getcwd(), "sessao_chrome")
-        tag = os.getenv("MERCADO_LIVRE_AFFILIATE_TAG", "fs20251223173450")
-        version = get_chrome_main_version() or 148
-        
-        options = uc.ChromeOptions()
-        options.add_argument(f"--user-data-dir={session_path}")
-        options.add_argument("--disable-notifications")
-        
-        # Como o bot roda em segundo plano e ML possui forte deteccao headless (403),
-        # nao usamos a flag --headless por padrao para garantir o sucesso da chamada.
-        
-        driver = None
         try:
-            print(f"\n>>> [ML Affiliate] Iniciando navegador Chrome para gerar links de afiliados (Tag: {tag})...")
-            driver = uc.Chrome(options=options, version_main=version)
-            print(">>> [ML Affiliate] Acessando o Portal do Link Builder...")
-            driver.get("https://www.mercadolivre.com.br/afiliados/linkbuilder")
-            time.sleep(6) # Espera carregar a pagina
-            
-            # Verifica se esta autenticado ou deu erro
-            if "Hubo un error" in driver.page_source or "login" in driver.current_url:
-                print(">>> [ML Affiliate] AVISO: Usuario nao autenticado no linkbuilder do Mercado Livre.")
-                print(">>> Por favor, execute 'python login_ml_affiliate.py' no terminal para realizar o login manual.")
-                driver.quit()
-                return deals
-                
-            js_script = """
-            const callback = arguments[arguments.length - 1];
-            const url = arguments[0];
-            const affiliateTag = arguments[1];
-            
-            const csrfMeta = document.querySelector('meta[name="csrf-token"]');
-            const csrfToken = csrfMeta ? csrfMeta.getAttribute('content') : '';
-            
-            fetch('/affiliate-program/api/v2/affiliates/createLink', {
-                method: 'POST',
-                headers: {
-                    'content-type': 'application/json',
-                    'x-csrf-token': csrfToken
-                },
-                body: JSON.stringify({
-                    urls: [url],
-                    tag: affiliateTag
-                })
-            })
-            .then(async res => {
-                const text = await res.text();
-                return {status: res.status, text: text};
-            })
-            .then(result => callback(result))
-            .catch(err => callback({error: err.toString()}));
-            """
-            
-            driver.set_script_timeout(15)
-            
-            for deal in deals:
+            print(f"\n>>> [ML Affiliate] Usando o navegador compartilhado para gerar {len(pending)} link(s) de afiliados (Tag: {tag})...")
+            browser = get_browser_manager(session_path)
+            with browser.tab() as driver:
+                if driver is None:
+                    print(">>> [ML Affiliate] Navegador reservado para o login manual. Mantendo links originais.")
+                    return deals
+                print(">>> [ML Affiliate] Acessando o Portal do Link Builder...")
+                driver.get("https://www.mercadolivre.com.br/afiliados/linkbuilder")
+                time.sleep(6) # Espera carregar a pagina
+                browser.log_page(driver, "Link Builder:")
+
+                # Verifica se esta autenticado ou deu erro
+                if "Hubo un error" in driver.page_source or "login" in driver.current_url:
+                    print(">>> [ML Affiliate] AVISO: Usuario nao autenticado no linkbuilder do Mercado Livre.")
+                    print(">>> Por favor, execute 'python login_ml_affiliate.py' no terminal para realizar o login manual.")
+                    print(">>> O bot fecha o navegador compartilhado enquanto o login estiver aberto.")
+                    return deals
+
+                # Renova a sessao salva para os proximos ciclos rodarem sem navegador
                 try:
-                    orig_url = deal["link"]
-                    print(f">>> [ML Affiliate] Gerando link de afiliado para: {deal['titulo'][:35]}...")
-                    
-                    result = driver.execute_async_script(js_script, orig_url, tag)
-                    
-                    if result.get("status") == 200:
-                        import json
-                        res_data = json.loads(result["text"])
-                        if res_data.get("total_success", 0) > 0:
-                            url_info = res_data["urls"][0]
-                            short_link = url_info.get("short_url")
-                            long_link = url_info.get("long_url")
-                            
-                            if short_link:
-                                deal["link"] = short_link
-                                print(f"   [Sucesso ML Affiliate] Link encurtado: {short_link}")
-                            elif long_link:
-                                deal["link"] = long_link
-                                print(f"   [Sucesso ML Affiliate] Link longo: {long_link[:50]}...")
-                        else:
-                            error_msg = res_data["urls"][0].get("message", "Erro retornado pela API")
-                            print(f"   [Erro ML Affiliate] Falha na API: {error_msg}")
-                    else:
-                        print(f"   [Erro ML Affiliate] HTTP {result.get('status')} ao tentar gerar link.")
+                    save_session_from_driver(driver)
                 except Exception as ex:
-                    print(f"   [Erro ML Affiliate] Falha ao processar link para '{deal['titulo'][:30]}': {ex}")
-                    
-            driver.quit()
+                    print(f">>> [ML Affiliate] Aviso: Falha ao salvar a sessao do navegador: {ex}")
+
+                driver.set_script_timeout(30)
+
+                for start in range(0, len(pending), batch_size):
+                    if self.is_cancelled():
+                        break
+                    chunk = pending[start:start + batch_size]
+                    try:
+                        print(f">>> [ML Affiliate] Gerando {len(chunk)} link(s) de afiliado em uma chamada...")
+                        result = driver.execute_async_script(CREATE_LINK_JS, [deal["link_original"] for deal in chunk], tag)
+                        if result.get("error"):
+                            print(f"   [Erro ML Affiliate] Falha na chamada: {result['error']}")
+                            continue
+                        self._apply_affiliate_response(chunk, result.get("status"), result.get("text", ""), tag)
+                    except Exception as ex:
+                        print(f"   [Erro ML Affiliate] Falha ao processar lote de {len(chunk)} link(s): {ex}")
         except Exception as e:
             print(f">>> [ML Affiliate] Erro geral ao gerar links de afiliados: {e}")
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
-                    
+
         return deals
 
     def close(self):
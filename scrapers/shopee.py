@@ -1,11 +1,99 @@
 import time
 import json
 import hashlib
-import requests
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from .base_scraper import BaseScraper
-from database.database import deal_exists
+from utils.http import get_session
+from utils.rate_limiter import get_rate_limiter
+from database.database import deals_exist_many
+from database.price_history import record_prices
+from database.shopee_reservoir import store_candidates, draw_candidates
+from database.keyword_stats import record_keyword_stats, schedule_keywords
+from database.feed_cursors import get_cursors, save_cursors
+
+# Lista padrão de palavras-chave para garantir variedade de categorias
+# (pode ser substituída por SHOPEE_KEYWORDS ou SHOPEE_KEYWORDS_FILE)
+KEYWORDS = [
+    "smartphone", "smartwatch", "fone bluetooth", "notebook",
+    "tablet", "monitor gamer", "teclado", "mouse gamer",
+    "caixa de som", "alexa", "power bank", "câmera",
+    "tv 4k", "playstation", "xbox", "nintendo",
+    "cadeira gamer", "drone", "projetor", "soundbar",
+    "air fryer", "robô aspirador", "cafeteira", "microondas", "game", "pc", "ssd", "hd",
+    "cartão de memória", "carregador", "cabo usb", "eletronico", "impressora",
+    "robo", "aspirador", "ventilador", "ferramenta", "furadeira", "parafusadeira",
+    "smart tv", "geladeira", "fogão", "freezer", "lavadora", "secadora", "celular", "iphone", "xiaomi", "samsung", "motorola", "sony",
+    "headphone", "headset", "earbuds", "kindle", "e-reader", "relógio inteligente", "massageador", "luminária", "smart home",
+    "iluminação", "câmera de segurança", "roteador", "modem", "gopro", "fitness", "pulseira fitness",
+    "carro", "soprador", "lavadora de alta pressão", "cortador de grama", "ferramenta elétrica", "serra elétrica", "brinquedo",
+    "caneca", "mochila", "relógio", "óculos de sol", "fones de ouvido", "liquidificador", "batedeira", "panela elétrica", "processador de alimentos"
+]
+
+def load_keywords():
+    """
+    Carrega as palavras-chave da configuração: SHOPEE_KEYWORDS (separadas por
+    vírgula) ou SHOPEE_KEYWORDS_FILE (uma por linha, '#' para comentários).
+    Sem configuração usa KEYWORDS. Repetições são removidas.
+    """
+    keywords = KEYWORDS
+    keywords_file = os.getenv("SHOPEE_KEYWORDS_FILE")
+    if os.getenv("SHOPEE_KEYWORDS"):
+        keywords = os.getenv("SHOPEE_KEYWORDS").split(",")
+    elif keywords_file:
+        try:
+            with open(keywords_file, "r", encoding="utf-8") as f:
+                keywords = [line for line in f if not line.strip().startswith("#")]
+        except OSError as e:
+            print(f">>> [Shopee] Erro ao ler {keywords_file}: {e}. Usando a lista padrão.")
+
+    unique = []
+    seen = set()
+    for kw in keywords:
+        kw = " ".join(kw.split())
+        if kw and kw.lower() not in seen:
+            seen.add(kw.lower())
+            unique.append(kw)
+    return unique
+
+# Feeds paginados da API de afiliados (listType 2 = mais vendidos na Shopee;
+# sortType 2 = mais vendidos, 5 = maior comissão)
+FEED_ARGS = {
+    "top": "listType: 2",
+    "commission": "sortType: 5",
+    "sales": "sortType: 2",
+}
+
+def parse_sources(spec):
+    """
+    Interpreta SHOPEE_SOURCES (separadas por vírgula), por exemplo
+    "keywords,top,commission,category:100636,shop:123456".
+
+    Returns:
+        tuple: (usa palavras-chave, dict feed -> argumentos da consulta)
+    """
+    use_keywords = False
+    feeds = {}
+    for source in (spec or "keywords").split(","):
+        source = source.strip().lower()
+        kind, _, value = source.partition(":")
+        if source == "keywords":
+            use_keywords = True
+        elif source in FEED_ARGS:
+            feeds[f"feed:{source}"] = FEED_ARGS[source]
+        elif kind == "category" and value.isdigit():
+            feeds[f"feed:{source}"] = f"productCatId: {value}, sortType: 2"
+        elif kind == "shop" and value.isdigit():
+            feeds[f"feed:{source}"] = f"shopId: {value}, sortType: 2"
+        elif source:
+            print(f">>> [Shopee] Fonte desconhecida em SHOPEE_SOURCES: {source}")
+    if not feeds:
+        use_keywords = True
+    return use_keywords, feeds
+
+# Campos pedidos para cada produto da consulta productOfferV2
+NODE_FIELDS = "productName priceMin imageUrl offerLink productLink itemId shopId commissionRate sales ratingStar priceDiscountRate"
 
 class ShopeeScraper(BaseScraper):
     def __init__(self, app_id=None, app_secret=None, limit=3):
@@ -29,8 +117,42 @@ class ShopeeScraper(BaseScraper):
             print(">>> [Shopee] AVISO: Credenciais não encontradas. Verifique o .env")
 
         self.limit = limit
+        # Palavras-chave buscadas por requisição (aliases no mesmo documento GraphQL)
+        try:
+            self.batch_size = max(int(os.getenv("SHOPEE_BATCH_SIZE", 5)), 1)
+        except ValueError:
+            self.batch_size = 5
+        # Requisições simultâneas (1 = sequencial), timeout por requisição e cota da API
+        try:
+            self.workers = max(int(os.getenv("SHOPEE_WORKERS", 3)), 1)
+            self.timeout = float(os.getenv("SHOPEE_REQUEST_TIMEOUT", 20))
+            rate_per_hour = max(float(os.getenv("SHOPEE_RATE_LIMIT_PER_HOUR", 2000)), 1)
+        except ValueError:
+            self.workers, self.timeout, rate_per_hour = 3, 20, 2000
+        self.rate_limiter = get_rate_limiter("shopee", rate=rate_per_hour, per=3600)
+        # Reservatório de candidatos entre ciclos: validade e máximo por palavra-chave
+        try:
+            self.reservoir_ttl_hours = float(os.getenv("SHOPEE_RESERVOIR_TTL_HOURS", 2))
+            self.reservoir_bucket_size = max(int(os.getenv("SHOPEE_RESERVOIR_BUCKET_SIZE", 20)), 1)
+        except ValueError:
+            self.reservoir_ttl_hours, self.reservoir_bucket_size = 2, 20
+        # Palavras-chave ordenadas pelo rendimento medido (0 = só rendimento, sem exploração)
+        self.keywords = load_keywords()
+        try:
+            self.exploration = float(os.getenv("SHOPEE_KEYWORD_EXPLORATION", 1.0))
+        except ValueError:
+            self.exploration = 1.0
+        self._latency = {}
+        # Fontes: busca por palavras-chave e/ou feeds paginados com cursor persistido
+        self.use_keywords, self.feeds = parse_sources(os.getenv("SHOPEE_SOURCES"))
+        self._cursors = {}
+        self._has_next = {}
         # Endpoint GraphQL da Shopee Brasil
         self.url = "https://open-api.affiliate.shopee.com.br/graphql"
+        # A consulta productOfferV2 é somente leitura, então o POST pode ser reenviado em falhas temporárias
+        # Sem reenvio após timeout de leitura e com espera curta em 429: o
+        # SHOPEE_REQUEST_TIMEOUT limita cada lote e a cota fica com o rate_limiter
+        self.session = get_session("shopee", retry_post=True, read_retries=0, max_retry_after=5)
 
     def _generate_signature(self, payload_str, timestamp):
         """
@@ -41,151 +163,293 @@ class ShopeeScraper(BaseScraper):
         signature = hashlib.sha256(factor.encode('utf-8')).hexdigest()
         return signature
 
-    def fetch_deals(self):
-        print(f">>> Acessando API Shopee: {self.url}")
-        
-        all_deals = []
-        seen_links = set()
-        
-        # Lista de palavras-chave para garantir variedade de categorias
-        keywords = [
-            "smartphone", "smartwatch", "fone bluetooth", "notebook", 
-            "tablet", "monitor gamer", "teclado", "mouse gamer", 
-            "caixa de som", "alexa", "power bank", "câmera", 
-            "tv 4k", "playstation", "xbox", "nintendo",
-            "cadeira gamer", "drone", "projetor", "soundbar",
-            "air fryer", "robô aspirador", "cafeteira", "microondas", "game", "pc", "ssd", "Hd", 
-            "cartão de memória", "carregador", "cabo usb", "eletronico", "notebook", "impressora",
-            "robo", "aspirador", "eletronico", "ventilador", "ferramenta", "furadeira", "parafusadeira",
-            "smart tv", "geladeira", "fogão", "freezer", "lavadora", "secadora", "smartphone", "celular", "iphone", "xiaomi", "samsung", "motorola", "sony",
-            "headphone", "headset", "earbuds", "tablet", "kindle", "e-reader", "smartwatch", "relógio inteligente", "massageador", "luminária", "smart home",
-            "iluminação", "câmera de segurança", "roteador", "modem", "drone", "gopro", "fitness", "pulseira fitness",
-            "carro", "soprador", "lavadora de alta pressão", "cortador de grama", "ferramenta elétrica", "serra elétrica", "brinquedo", 
-            "caneca", "mochila", "relógio", "óculos de sol", "fones de ouvido", "cafeteira", "liquidificador", "batedeira", "air fryer", "panela elétrica", "processador de alimentos"
-        ]
-        random.shuffle(keywords)
+    def _product_link(self, node):
+        """
+        Link do produto (loja/item) usado na deduplicação.
+        O offerLink é um link curto de rastreamento e não identifica o produto.
+        """
+        if node.get("shopId") and node.get("itemId"):
+            return f"https://shopee.com.br/product/{node['shopId']}/{node['itemId']}"
+        return node.get("productLink") or node.get("offerLink")
 
+    def _build_query(self, searches):
+        """
+        Monta um único documento GraphQL com uma busca por alias
+        (kw0: productOfferV2(...), kw1: ...), assinado e enviado uma só vez.
+
+        Args:
+            searches (list): Tuplas (alias, argumentos da consulta).
+        """
+        blocks = []
+        for alias, args_str in searches:
+            blocks.append("%s: productOfferV2(%s) { nodes { %s } pageInfo { hasNextPage } }" % (alias, args_str, NODE_FIELDS))
+        return "{ %s }" % " ".join(blocks)
+
+    def _post_query(self, query):
+        """Assina e envia a consulta. Retorna o JSON da resposta."""
+        # Prepara o payload. O json.dumps com separators remove espaços em branco
+        # para garantir que o hash corresponda ao corpo enviado.
+        payload_dict = {"query": query}
+        payload_str = json.dumps(payload_dict, separators=(',', ':'))
+
+        timestamp = int(time.time())
+        signature = self._generate_signature(payload_str, timestamp)
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"SHA256 Credential={self.app_id}, Timestamp={timestamp}, Signature={signature}"
+        }
+        response = self.session.post(self.url, data=payload_str, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _search_batch(self, keywords):
+        """
+        Busca várias palavras-chave (ou feeds 'feed:...') em uma única requisição.
+
+        Returns:
+            dict: palavra-chave -> lista de nós. Palavras cujo alias retornou
+            erro (resposta parcial) ficam de fora.
+        """
+        searches = []
+        alias_to_kw = {}
+        for i, kw in enumerate(keywords):
+            alias = f"kw{i}"
+            if kw in self.feeds:
+                # Feeds seguem o cursor salvo: cada ciclo lê a página seguinte
+                args_str = f"page: {self._cursors.get(kw, 1)}, limit: 20, {self.feeds[kw]}"
+            else:
+                # Varia a página para encontrar "próximos produtos" se os primeiros forem duplicados
+                page = random.randint(1, 5)
+                args_str = ", ".join([f"page: {page}", "limit: 20", f"keyword: {json.dumps(kw, ensure_ascii=False)}"])
+            searches.append((alias, args_str))
+            alias_to_kw[alias] = kw
+
+        # Respeita a cota da API de afiliados, compartilhada entre ciclos e threads
+        if not self.rate_limiter.acquire(timeout=self.timeout):
+            raise RuntimeError("cota de requisições da API esgotada no momento")
+        print(f"   [Shopee] Enviando {len(keywords)} busca(s) em uma requisição: {', '.join(keywords)}")
+        started = time.monotonic()
+        data = self._post_query(self._build_query(searches))
+        elapsed_ms = (time.monotonic() - started) * 1000
         for kw in keywords:
-            if len(all_deals) >= self.limit:
-                break
+            self._latency[kw] = elapsed_ms
 
-            # Monta argumentos da query
-            # Busca mais itens e varia a página para encontrar "próximos produtos" se os primeiros forem duplicados
-            page = random.randint(1, 5)
-            args_list = [f"page: {page}", f"limit: 20", f'keyword: "{kw}"']
-            print(f"   [Shopee] Buscando por: {kw}")
-            
-            args_str = ", ".join(args_list)
-
-            # Query GraphQL para buscar ofertas (ProductOfferV2 é comum para ofertas gerais)
-            # Ajuste os campos conforme a necessidade real do seu projeto
-            query = """
-            {
-                productOfferV2(%s) {
-                    nodes {
-                        productName
-                        priceMin
-                        imageUrl
-                        offerLink
-                        commissionRate
-                        sales
-                        ratingStar
-                        priceDiscountRate
-                    }
-                }
-            }
-            """ % args_str
-
-            # Prepara o payload. O json.dumps com separators remove espaços em branco
-            # para garantir que o hash corresponda ao corpo enviado.
-            payload_dict = {"query": query}
-            payload_str = json.dumps(payload_dict, separators=(',', ':'))
-            
-            timestamp = int(time.time())
-            signature = self._generate_signature(payload_str, timestamp)
+        # Em respostas parciais, 'errors' aponta o alias que falhou (path) e 'data' traz os demais
+        failed = set()
+        for error in data.get("errors") or []:
+            path = error.get("path") or []
+            if path and path[0] in alias_to_kw:
+                failed.add(path[0])
+                print(f"   [Erro API Shopee] {alias_to_kw[path[0]]}: {error.get('message')}")
+            else:
+                print(f"   [Erro API Shopee] {error}")
 
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"SHA256 Credential={self.app_id}, Timestamp={timestamp}, Signature={signature}"
-            }
+        results = {}
+        payload = data.get("data") or {}
+        if not payload and not data.get("errors"):
+            print(f"   [Aviso Shopee] Resposta inesperada da API: {data}")
+        for alias, kw in alias_to_kw.items():
+            if alias in failed or not payload.get(alias):
+                continue
+            results[kw] = payload[alias].get("nodes") or []
+            self._has_next[kw] = bool((payload[alias].get("pageInfo") or {}).get("hasNextPage"))
+        return results
 
+    def _node_to_deal(self, node, product_link):
+        price = node.get("priceMin")
+        formatted_price = "Ver no site"
+        if price:
             try:
-                response = requests.post(self.url, data=payload_str, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                
-                if "errors" in data:
-                    print(f"   [Erro API Shopee] {data['errors']}")
+                # Garante que seja string e remove espaços antes de converter
+                price_val = float(str(price).strip())
+                formatted_price = f"R$ {price_val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+            except (ValueError, TypeError):
+                formatted_price = f"R$ {price}"
+
+        # Formata o desconto se houver
+        discount = node.get("priceDiscountRate")
+        discount_msg = None
+        if discount and int(discount) > 0:
+            discount_msg = f"🔥 {discount}% OFF"
+
+        return {
+            "titulo": node.get("productName"),
+            "preco": formatted_price,
+            "link": node.get("offerLink"),
+            "link_original": product_link,
+            "imagem": node.get("imageUrl"),
+            "comissao": node.get("commissionRate"),
+            "desconto_pix": discount_msg
+        }
+
+    def _passes_filters(self, node):
+        # Filtro de Vendas (Mínimo 20)
+        sales = node.get("sales") or 0
+        if int(sales) < self.min_sales:
+            print(f"   [Shopee] Ignorando (Vendas {sales} < {self.min_sales}): {node.get('productName')[:50]}...")
+            return False
+
+        # Filtro de Avaliação (Mínimo 4.0)
+        rating_str = node.get("ratingStar")
+        try:
+            rating = float(rating_str) if rating_str else 0.0
+        except (ValueError, TypeError):
+            rating = 0.0
+
+        if rating < self.min_rating:
+            print(f"   [Shopee] Ignorando (Avaliação {rating} < {self.min_rating}): {node.get('productName')[:50]}...")
+            return False
+        return True
+
+    def _pick_deals(self, results, seen_links, all_deals):
+        """
+        Escolhe uma oferta válida por palavra-chave, na ordem em que foram buscadas.
+        Os demais produtos que passaram nos filtros (já pagos na mesma requisição)
+        vão para o reservatório e abastecem os próximos ciclos.
+        """
+        # Verifica no banco, de uma só vez, todos os produtos retornados pelo lote
+        existing = deals_exist_many(
+            self._product_link(node) for nodes in results.values() for node in nodes
+        )
+        # Histórico de preços: registra todos os produtos retornados, antes dos filtros
+        record_prices(
+            {"link_original": self._product_link(node), "preco": node.get("priceMin")}
+            for nodes in results.values() for node in nodes
+        )
+        spare = []
+        stats = []
+        for kw, nodes in results.items():
+            if not nodes:
+                print(f"   [Shopee] Nenhum produto encontrado para {kw}.")
+            picked = len(all_deals) >= self.limit
+            valid = duplicates = 0
+            for node in nodes:
+                if not node.get("offerLink"):
+                    continue
+                product_link = self._product_link(node)
+                if not self._passes_filters(node):
                     continue
 
-                if "data" in data and data["data"] and "productOfferV2" in data["data"]:
-                    nodes = data["data"]["productOfferV2"]["nodes"]
-                    if not nodes:
-                        print(f"   [Shopee] Nenhum produto encontrado para {kw}.")
-
-                    for node in nodes:
-                        link = node.get("offerLink")
-                        if not link:
-                            continue
-
-                        # Filtro de Vendas (Mínimo 20)
-                        sales = node.get("sales") or 0
-                        if int(sales) < self.min_sales:
-                            print(f"   [Shopee] Ignorando (Vendas {sales} < {self.min_sales}): {node.get('productName')[:50]}...")
-                            continue
-
-                        # Filtro de Avaliação (Mínimo 4.0)
-                        rating_str = node.get("ratingStar")
-                        try:
-                            rating = float(rating_str) if rating_str else 0.0
-                        except (ValueError, TypeError):
-                            rating = 0.0
-                        
-                        if rating < self.min_rating:
-                            print(f"   [Shopee] Ignorando (Avaliação {rating} < {self.min_rating}): {node.get('productName')[:50]}...")
-                            continue
-
-                        # Verifica duplicatas na mesma execução e no banco de dados
-                        if link in seen_links or deal_exists(link):
-                            print(f"   [Shopee] Ignorando duplicata: {node.get('productName')[:50]}...")
-                            continue
-                        seen_links.add(link)
-
-                        price = node.get("priceMin")
-                        formatted_price = "Ver no site"
-                        if price:
-                            try:
-                                # Garante que seja string e remove espaços antes de converter
-                                price_val = float(str(price).strip())
-                                formatted_price = f"R$ {price_val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                            except (ValueError, TypeError):
-                                formatted_price = f"R$ {price}"
-
-                        # Formata o desconto se houver
-                        discount = node.get("priceDiscountRate")
-                        discount_msg = None
-                        if discount and int(discount) > 0:
-                            discount_msg = f"🔥 {discount}% OFF"
-
-                        all_deals.append({
-                            "titulo": node.get("productName"),
-                            "preco": formatted_price,
-                            "link": link,
-                            "imagem": node.get("imageUrl"),
-                            "comissao": node.get("commissionRate"),
-                            "desconto_pix": discount_msg
-                        })
-                        print(f"   [Shopee] Encontrado: {node.get('productName')[:50]}...")
-                        # Encontrou um produto válido para esta categoria, passa para a próxima
-                        break
-                else:
-                    print(f"   [Aviso Shopee] Resposta inesperada da API: {data}")
-                
+                # Verifica duplicatas na mesma execução e no banco de dados
+                if product_link in seen_links or product_link in existing:
+                    print(f"   [Shopee] Ignorando duplicata: {node.get('productName')[:50]}...")
+                    duplicates += 1
+                    continue
+                seen_links.add(product_link)
+                valid += 1
+
+                deal = self._node_to_deal(node, product_link)
+                if picked:
+                    spare.append((kw, deal))
+                    continue
+                all_deals.append(deal)
+                print(f"   [Shopee] Encontrado: {node.get('productName')[:50]}...")
+                # Encontrou um produto válido para esta categoria; os próximos vão para o reservatório
+                picked = True
+            stats.append((kw, valid, duplicates, self._latency.pop(kw, 0)))
+            if kw in self.feeds:
+                # Avança o cursor do feed; volta ao início quando as páginas acabam
+                has_next = self._has_next.pop(kw, False)
+                self._cursors[kw] = self._cursors.get(kw, 1) + 1 if nodes and has_next else 1
+
+        # Rendimento por palavra-chave, usado para priorizar as buscas dos próximos ciclos
+        record_keyword_stats(stats)
+
+        if spare:
+            store_candidates(spare, self.reservoir_bucket_size)
+            print(f"   [Shopee] {len(spare)} candidato(s) guardado(s) no reservatório.")
+
+    def _fetch_sequential(self, batches, seen_links, all_deals):
+        """Busca os lotes um a um, entregando as ofertas escolhidas em cada lote."""
+        for batch in batches:
+            if len(all_deals) >= self.limit or self.is_cancelled():
+                break
+            try:
+                results = self._search_batch(batch)
             except Exception as e:
-                print(f"   [Erro Shopee] Falha na requisição para {kw}: {e}")
+                print(f"   [Erro Shopee] Falha na requisição para {', '.join(batch)}: {e}")
                 continue
-        
-        return all_deals
+            found = len(all_deals)
+            self._pick_deals(results, seen_links, all_deals)
+            yield from all_deals[found:]
+
+    def _fetch_concurrent(self, batches, seen_links, all_deals):
+        """
+        Mantém até 'workers' requisições em andamento. Os resultados são
+        processados nesta thread conforme chegam (e as ofertas entregues na
+        hora), e as requisições restantes são canceladas assim que 'limit'
+        ofertas forem encontradas.
+        """
+        pending_batches = iter(batches)
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="shopee")
+        in_flight = {}
+        try:
+            for batch in pending_batches:
+                in_flight[executor.submit(self._search_batch, batch)] = batch
+                if len(in_flight) >= self.workers:
+                    break
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        print(f"   [Erro Shopee] Falha na requisição para {', '.join(batch)}: {e}")
+                        continue
+                    found = len(all_deals)
+                    self._pick_deals(results, seen_links, all_deals)
+                    yield from all_deals[found:]
+                if len(all_deals) >= self.limit:
+                    if in_flight:
+                        print(f"   [Shopee] {len(all_deals)} ofertas encontradas. Cancelando {len(in_flight)} requisição(ões) restante(s).")
+                    break
+                if self.is_cancelled():
+                    print("   [Shopee] Prazo esgotado. Cancelando requisições restantes.")
+                    break
+                # Repõe as vagas liberadas com os próximos lotes
+                for batch in pending_batches:
+                    in_flight[executor.submit(self._search_batch, batch)] = batch
+                    if len(in_flight) >= self.workers:
+                        break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_deals(self):
+        return list(self.iter_deals())
+
+    def iter_deals(self):
+        """Entrega as ofertas assim que cada lote de buscas é processado."""
+        print(f">>> Acessando API Shopee: {self.url}")
+
+        all_deals = []
+        seen_links = set()
+
+        # Usa primeiro os candidatos guardados em ciclos anteriores
+        for deal in draw_candidates(self.limit, self.reservoir_ttl_hours):
+            seen_links.add(deal["link_original"])
+            all_deals.append(deal)
+            print(f"   [Shopee] Do reservatório: {deal['titulo'][:50]}...")
+            yield deal
+        if len(all_deals) >= self.limit:
+            print(f">>> [Shopee] {len(all_deals)} oferta(s) vieram do reservatório. Nenhuma chamada à API neste ciclo.")
+            return
+
+        # Os feeds vêm antes das palavras-chave: cada página do cursor traz produtos ainda não vistos
+        self._cursors = get_cursors(self.feeds)
+        sources = list(self.feeds)
+        if self.use_keywords:
+            sources += schedule_keywords(self.keywords, self.exploration)
+        batches = [sources[i:i + self.batch_size] for i in range(0, len(sources), self.batch_size)]
+
+        try:
+            if self.workers > 1:
+                yield from self._fetch_concurrent(batches, seen_links, all_deals)
+            else:
+                yield from self._fetch_sequential(batches, seen_links, all_deals)
+        finally:
+            save_cursors(self._cursors)
 
     def close(self):
         """Método para manter compatibilidade com o app.py (não requer fechamento real)."""
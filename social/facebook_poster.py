@@ -1,6 +1,6 @@
 import os
-import requests
 from .base_poster import BasePoster
+from utils.http import get_session
 from utils.image_generator import ImageGenerator
 
 class FacebookPoster(BasePoster):
@@ -18,6 +18,7 @@ class FacebookPoster(BasePoster):
         # Base URL para fotos (mais visual para o Feed)
         self.photos_url = f"https://graph.facebook.com/v24.0/{self.page_id}/photos"
         self.feed_url = f"https://graph.facebook.com/v24.0/{self.page_id}/feed"
+        self.session = get_session("graph")
 
     def _get_page_token(self):
         """
@@ -29,7 +30,7 @@ class FacebookPoster(BasePoster):
                 'fields': 'access_token',
                 'access_token': self.access_token
             }
-            resp = requests.get(url, params=params, timeout=10)
+            resp = self.session.get(url, params=params, timeout=10)
             data = resp.json()
             if resp.status_code == 200 and 'access_token' in data:
                 return data['access_token']
@@ -50,7 +51,7 @@ class FacebookPoster(BasePoster):
             params = {'access_token': page_token}
             with open(local_path, 'rb') as img_file:
                 files = {'source': ('story.jpg', img_file, 'image/jpeg')}
-                resp = requests.post(url, params=params, files=files, timeout=60)
+                resp = self.session.post(url, params=params, files=files, timeout=60)
             resp.raise_for_status()
             print(f"   [Facebook] Story publicado! ID: {resp.json().get('id')}")
         except Exception as e:
@@ -101,11 +102,11 @@ class FacebookPoster(BasePoster):
                 with open(local_path, 'rb') as img_file:
                     payload = {'message': message, 'access_token': final_token}
                     files = {'source': ('feed.jpg', img_file, 'image/jpeg')}
-                    response = requests.post(self.photos_url, data=payload, files=files, timeout=45)
+                    response = self.session.post(self.photos_url, data=payload, files=files, timeout=45)
             else:
                 # Fallback: Posta como LINK (comportamento antigo)
                 payload = {'message': message, 'link': deal_data['link'], 'access_token': final_token}
-                response = requests.post(self.feed_url, data=payload, timeout=30)
+                response = self.session.post(self.feed_url, data=payload, timeout=30)
 
             response.raise_for_status()
             print(f"   [Facebook] Sucesso no Feed! ID: {response.json().get('id')}")
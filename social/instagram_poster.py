@@ -1,4 +1,3 @@
-import requests
 import time
 import io
 import os
@@ -10,6 +9,7 @@ except ImportError:
 
 from .base_poster import BasePoster
 from utils.image_generator import ImageGenerator
+from utils.http import get_session
 
 class InstagramPoster(BasePoster):
     """
@@ -26,6 +26,7 @@ class InstagramPoster(BasePoster):
         self.account_id = account_id.strip().strip('"').strip("'")
         self.base_url = f"https://graph.facebook.com/v24.0/{self.account_id}"
         self._id_checked = False
+        self.session = get_session("graph")
 
     def _check_and_fix_account_id(self):
         """
@@ -37,7 +38,7 @@ class InstagramPoster(BasePoster):
         try:
             url = f"https://graph.facebook.com/v24.0/{self.account_id}"
             params = {'fields': 'instagram_business_account,name', 'access_token': self.access_token}
-            resp = requests.get(url, params=params, timeout=10)
+            resp = self.session.get(url, params=params, timeout=10)
             
             if resp.status_code == 200:
                 data = resp.json()
@@ -59,7 +60,7 @@ class InstagramPoster(BasePoster):
         for attempt in range(3):
             try:
                 with open(file_path, 'rb') as img:
-                    resp = requests.post('https://api.imgur.com/3/image', headers=headers, files={'image': img}, timeout=30)
+                    resp = self.session.post('https://api.imgur.com/3/image', headers=headers, files={'image': img}, timeout=30)
                 resp.raise_for_status()
                 return resp.json()['data']['link']
             except Exception:
@@ -76,18 +77,18 @@ class InstagramPoster(BasePoster):
         try:
             create_url = f"{self.base_url}/media"
             payload = {'image_url': final_url, 'media_type': 'STORIES', 'access_token': self.access_token}
-            resp = requests.post(create_url, data=payload, timeout=30)
+            resp = self.session.post(create_url, data=payload, timeout=30)
             resp.raise_for_status()
             container_id = resp.json().get('id')
             ready = False
             for _ in range(6):
                 time.sleep(5)
-                r = requests.get(f"https://graph.facebook.com/v24.0/{container_id}", params={'fields': 'status_code', 'access_token': self.access_token}, timeout=10)
+                r = self.session.get(f"https://graph.facebook.com/v24.0/{container_id}", params={'fields': 'status_code', 'access_token': self.access_token}, timeout=10)
                 if r.status_code == 200 and r.json().get('status_code') == 'FINISHED':
                     ready = True
                     break
             if ready:
-                requests.post(f"{self.base_url}/media_publish", data={'creation_id': container_id, 'access_token': self.access_token}, timeout=30)
+                self.session.post(f"{self.base_url}/media_publish", data={'creation_id': container_id, 'access_token': self.access_token}, timeout=30)
                 print(f"   [Instagram] Story publicado!")
         except Exception as e:
             print(f"   [Instagram] Erro ao postar Story: {e}")
@@ -139,18 +140,18 @@ class InstagramPoster(BasePoster):
             'access_token': self.access_token
         }
         try:
-            resp = requests.post(f"{self.base_url}/media", data=payload, timeout=30)
+            resp = self.session.post(f"{self.base_url}/media", data=payload, timeout=30)
             resp.raise_for_status()
             container_id = resp.json().get('id')
             ready = False
             for _ in range(6):
                 time.sleep(5)
-                r = requests.get(f"https://graph.facebook.com/v24.0/{container_id}", params={'fields': 'status_code', 'access_token': self.access_token}, timeout=10)
+                r = self.session.get(f"https://graph.facebook.com/v24.0/{container_id}", params={'fields': 'status_code', 'access_token': self.access_token}, timeout=10)
                 if r.status_code == 200 and r.json().get('status_code') == 'FINISHED':
                     ready = True
                     break
             if ready:
-                requests.post(f"{self.base_url}/media_publish", data={'creation_id': container_id, 'access_token': self.access_token}, timeout=30)
+                self.session.post(f"{self.base_url}/media_publish", data={'creation_id': container_id, 'access_token': self.access_token}, timeout=30)
                 print(f"   [Instagram] Feed publicado!")
             
             # Posta no Story apenas se ativado
@@ -1,7 +1,7 @@
 import os
 import time
-import requests
 from .base_poster import BasePoster
+from utils.http import get_session
 
 class WhatsappPoster(BasePoster):
     """
@@ -16,6 +16,7 @@ class WhatsappPoster(BasePoster):
             "apikey": self.api_key,
             "Content-Type": "application/json"
         }
+        self.session = get_session("evolution", timeout=(5, 60))
 
     def post_deal(self, deal_data):
         """
@@ -78,10 +79,10 @@ class WhatsappPoster(BasePoster):
                     file_handle = open(deal_data['imagem'], 'rb')
                     files_payload = {'file': (os.path.basename(deal_data['imagem']), file_handle, 'image/jpeg')}
                     # Envio Multipart (Local)
-                    response = requests.post(url_endpoint, data=payload, files=files_payload, headers=headers)
+                    response = self.session.post(url_endpoint, data=payload, files=files_payload, headers=headers)
                 else:
                     # Envio JSON (URL ou Texto)
-                    response = requests.post(url_endpoint, json=payload, headers=self.headers)
+                    response = self.session.post(url_endpoint, json=payload, headers=self.headers)
                 
                 response.raise_for_status()
                 print(f"   Oferta enviada com sucesso (Status: {response.status_code}).")
@@ -121,7 +122,7 @@ class WhatsappPoster(BasePoster):
         }
         
         try:
-            response = requests.post(url_endpoint, json=payload, headers=self.headers)
+            response = self.session.post(url_endpoint, json=payload, headers=self.headers)
             response.raise_for_status()
             return True
         except Exception as e:
@@ -0,0 +1,59 @@
+from database.canonical import canonical_key
+from database.price_history import price_to_cents
+
+# Links diferentes do mesmo produto precisam resultar na mesma chave (deduplicação)
+CANONICAL_CASES = [
+    # Mercado Livre: item, catálogo, user product e filtros de item
+    ("https://produto.mercadolivre.com.br/MLB-1234567890-fone-bluetooth-_JM", "ml:MLB1234567890"),
+    ("https://www.mercadolivre.com.br/fone-bluetooth/p/MLB19876543?pdp_filters=item_id:MLB1234567890", "ml:MLB1234567890"),
+    ("https://www.mercadolivre.com.br/fone-bluetooth/p/MLB19876543", "ml:MLB19876543"),
+    ("https://www.mercadolivre.com.br/fone/up/MLBU3012345678?matt_tool=123", "ml:MLBU3012345678"),
+    ("https://www.mercadolivre.com.br/p/MLB19876543#wid=MLB1234567890", "ml:MLB1234567890"),
+    # Shopee: /product/<loja>/<item> e slug "-i.<loja>.<item>"
+    ("https://shopee.com.br/product/123456/7890123?utm_source=an", "shopee:123456.7890123"),
+    ("https://shopee.com.br/Fone-Bluetooth-i.123456.7890123?sp_atk=abc", "shopee:123456.7890123"),
+    # Magazine Luiza / Magazine Você: SKU em /p/<sku>/
+    ("https://www.magazineluiza.com.br/smart-tv-50/p/237146700/et/tv4k/?seller_id=magazineluiza", "magalu:237146700"),
+    ("https://www.magazinevoce.com.br/magazineachadostecbr/smart-tv-50/p/237146700/et/tv4k/", "magalu:237146700"),
+    ("https://www.magazineluiza.com.br/fone/p/ABC123DEF/", "magalu:abc123def"),
+    # Links curtos de afiliado: host + caminho, sem query string
+    ("https://s.shopee.com.br/AbCdEf?share=1", "url:s.shopee.com.br/AbCdEf"),
+    ("https://mercadolivre.com/sec/1a2B3c", "url:mercadolivre.com/sec/1a2B3c"),
+    ("https://www.exemplo.com/oferta/", "url:exemplo.com/oferta"),
+    ("", None),
+    (None, None),
+]
+
+# Formatos de preço dos scrapers: BR com e sem centavos (ML, Magalu), ponto decimal (API da Shopee)
+PRICE_CASES = [
+    ("R$ 1.299,90", 129990),
+    ("R$ 1.299", 129900),
+    ("R$ 12.345", 1234500),
+    ("R$ 1299.90", 129990),
+    ("R$ 45,99", 4599),
+    ("45,99", 4599),
+    ("1299.90", 129990),
+    ("129.9", 12990),
+    (1299.9, 129990),
+    (45, 4500),
+    ("Ver no site", None),
+    ("", None),
+    (None, None),
+]
+
+print("=== TESTE DE CHAVES CANÔNICAS E PREÇOS ===")
+falhas = 0
+for link, esperado in CANONICAL_CASES:
+    obtido = canonical_key(link)
+    if obtido != esperado:
+        falhas += 1
+        print(f"[FALHA] canonical_key({link!r}) = {obtido!r}, esperado {esperado!r}")
+
+for preco, esperado in PRICE_CASES:
+    obtido = price_to_cents(preco)
+    if obtido != esperado:
+        falhas += 1
+        print(f"[FALHA] price_to_cents({preco!r}) = {obtido!r}, esperado {esperado!r}")
+
+assert falhas == 0, f"{falhas} caso(s) falharam"
+print(f"OK ({len(CANONICAL_CASES)} links e {len(PRICE_CASES)} preços)")
@@ -0,0 +1,26 @@
+from scrapers.magazine_luiza import is_challenge
+
+# (status, html, é desafio?)
+CASES = [
+    (200, '<html><head><title>Smart TV 50" | Magazine Luiza</title>'
+          '<script src="https://www.google.com/recaptcha/api.js"></script></head><body>...</body></html>', False),
+    (200, '<html><head><title>Fone Bluetooth</title><script src="https://js.hcaptcha.com/1/api.js"></script>'
+          '</head><body><p>Acesso negado? Fale conosco</p></body></html>', False),
+    (200, '<html><head><title>Access Denied</title></head><body></body></html>', True),
+    (200, '<html><head><title>Are you a robot?</title></head><body></body></html>', True),
+    (200, '<html><body><div id="px-captcha"></div></body></html>', True),
+    (403, '<html><head><title>Magazine Luiza</title></head></html>', True),
+    (429, '', True),
+    (200, '', False),
+]
+
+print("=== TESTE DE DETECÇÃO DE DESAFIO ANTI-BOT (MAGALU) ===")
+falhas = 0
+for status, html, esperado in CASES:
+    obtido = is_challenge(status, html)
+    if obtido != esperado:
+        falhas += 1
+        print(f"[FALHA] is_challenge({status}, {html[:60]!r}...) = {obtido}, esperado {esperado}")
+
+assert falhas == 0, f"{falhas} caso(s) falharam"
+print(f"OK ({len(CASES)} casos)")
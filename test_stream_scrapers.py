@@ -0,0 +1,42 @@
+import os
+import time
+
+# Prazo curto para o teste: o consumidor abaixo demora mais do que isso para postar tudo
+os.environ["SCRAPER_TIMEOUT_SECONDS"] = "2"
+
+from app import stream_scrapers
+from scrapers.base_scraper import BaseScraper
+
+class FastScraper(BaseScraper):
+    """Entrega 5 ofertas na hora e termina dentro do prazo."""
+    def fetch_deals(self):
+        return [{"titulo": f"Produto {i}", "link": f"https://www.mercadolivre.com.br/p/MLB{i}"} for i in range(5)]
+
+class HangingScraper(BaseScraper):
+    """Não termina até ser cancelado."""
+    def fetch_deals(self):
+        while not self.is_cancelled():
+            time.sleep(0.1)
+        return []
+
+alertas = []
+
+detalhes = []
+
+def notify_error(e, context="", details=None):
+    alertas.append(context)
+    detalhes.append(details)
+
+print("=== TESTE DO PRAZO DOS SCRAPERS COM CONSUMIDOR LENTO ===")
+recebidas = []
+inicio = time.monotonic()
+for oferta in stream_scrapers([FastScraper(), HangingScraper()], notify_error):
+    recebidas.append(oferta["titulo"])
+    time.sleep(1)  # Simula a postagem de cada oferta
+
+print(f"\nOfertas recebidas: {len(recebidas)} em {time.monotonic() - inicio:.1f}s")
+print("Alertas:", alertas)
+assert len(recebidas) == 5, "Ofertas de um scraper que terminou no prazo foram descartadas"
+assert alertas == ["Execução do scraper HangingScraper"], "Alerta de prazo incorreto"
+assert detalhes[0] and "HangingScraper" in detalhes[0], "Alerta de prazo sem detalhes (traceback vazio fora do except)"
+print("OK")
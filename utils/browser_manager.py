@@ -0,0 +1,456 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import atexit
+import threading
+import subprocess
+from contextlib import contextmanager
+
+# Correção para Python 3.12+: O undetected_chromedriver precisa do distutils,
+# que foi removido. Importar o setuptools restaura essa funcionalidade.
+try:
+    import setuptools  # noqa: F401
+except ImportError:
+    pass
+uc_error = None
+try:
+    import undetected_chromedriver as uc
+except Exception as e:
+    uc = None
+    uc_error = e
+
+# psutil é opcional: sem ele o reinício por uso de memória fica desativado
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_DIR, ".browser_cache")
+VERSION_FILE = os.path.join(CACHE_DIR, "chrome_version.json")
+DRIVER_FILE = os.path.join(CACHE_DIR, "chromedriver.exe" if sys.platform == "win32" else "chromedriver")
+
+FALLBACK_VERSION = 148
+VERSION_CACHE_SECONDS = 24 * 3600
+
+# Pedido de liberação do perfil (login manual com login_ml_affiliate.py): o Chrome só
+# abre um processo por perfil, então enquanto o arquivo existir o bot fecha o Chrome
+# compartilhado e não abre outro. O bot confirma escrevendo "released" no arquivo.
+RELEASE_FILE = os.path.join(CACHE_DIR, "release_profile")
+RELEASE_POLL_SECONDS = 5
+# Arquivos que o Chrome mantém no perfil enquanto está aberto (Linux/macOS e Windows)
+PROFILE_LOCK_FILES = ("SingletonLock", "lockfile")
+
+# Modo enxuto: os scrapers só leem texto do DOM e atributos 'src', então imagens,
+# mídia, fontes e rastreadores são bloqueados via CDP (Network.setBlockedURLs)
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*connect.facebook.com*",
+    "*hotjar.com*", "*clarity.ms*", "*criteo.com*", "*criteo.net*",
+    "*tiktok.com*", "*analytics.tiktok.com*", "*taboola.com*", "*outbrain.com*",
+    "*newrelic.com*", "*nr-data.net*", "*dynatrace.com*",
+]
+
+LEAN_ARGUMENTS = [
+    "--window-size=1366,900",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-component-update",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--mute-audio",
+]
+
+# Soma o que a página transferiu (documento + recursos) e o tempo até o load
+PAGE_STATS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const r of resources) bytes += (r.transferSize || 0);
+return {
+    bytes: bytes,
+    requests: resources.length + (nav ? 1 : 0),
+    ms: nav ? Math.round((nav.loadEventEnd || nav.domContentLoadedEventEnd || nav.duration)) : 0
+};
+"""
+
+def _detect_windows_version():
+    commands = [
+        r'reg query "HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon" /v version',
+        r'reg query "HKEY_LOCAL_MACHINE\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall\Google Chrome" /v version',
+        r'(Get-Item "C:\Program Files\Google\Chrome\Application\chrome.exe").VersionInfo.ProductVersion',
+        r'(Get-Item "C:\Program Files (x86)\Google\Chrome\Application\chrome.exe").VersionInfo.ProductVersion'
+    ]
+    for cmd in commands:
+        try:
+            if "reg query" in cmd:
+                output = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL).decode()
+                version = re.search(r'(\d+)\.', output)
+            else:
+                # PowerShell commands
+                ps_cmd = f"powershell -command \"{cmd}\""
+                output = subprocess.check_output(ps_cmd, shell=True, stderr=subprocess.DEVNULL).decode().strip()
+                version = re.search(r'^(\d+)', output)
+            if version:
+                return int(version.group(1))
+        except Exception:
+            continue
+    return None
+
+def _detect_unix_version():
+    candidates = [
+        "google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+    ]
+    for candidate in candidates:
+        binary = shutil.which(candidate) or (candidate if os.path.isfile(candidate) else None)
+        if not binary:
+            continue
+        try:
+            output = subprocess.check_output([binary, "--version"], stderr=subprocess.DEVNULL, timeout=10).decode()
+            version = re.search(r'(\d+)\.\d+', output)
+            if version:
+                return int(version.group(1))
+        except Exception:
+            continue
+    return None
+
+def get_chrome_main_version(force=False):
+    """
+    Detecta a versão principal do Chrome instalado (Windows, Linux ou macOS).
+    O resultado fica em cache em disco por 24h para não disparar os comandos
+    de detecção (reg query / PowerShell / --version) a cada ciclo.
+    """
+    if not force and os.path.exists(VERSION_FILE):
+        try:
+            with open(VERSION_FILE, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if time.time() - cached.get("checked_at", 0) < VERSION_CACHE_SECONDS and cached.get("version"):
+                return int(cached["version"])
+        except Exception:
+            pass
+
+    version = _detect_windows_version() if sys.platform == "win32" else _detect_unix_version()
+    if version:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(VERSION_FILE, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "checked_at": time.time()}, f)
+        except OSError:
+            pass
+    return version
+
+def release_requested():
+    """Indica se o login manual pediu o perfil do Chrome."""
+    return os.path.exists(RELEASE_FILE)
+
+def _write_release(state):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(RELEASE_FILE, "w", encoding="utf-8") as f:
+            f.write(state)
+    except OSError as e:
+        print(f">>> [Browser] Aviso: Não foi possível gravar o pedido de liberação do perfil: {e}")
+
+def _profile_in_use(session_path):
+    return any(os.path.lexists(os.path.join(session_path, name)) for name in PROFILE_LOCK_FILES)
+
+def request_profile_release(session_path, timeout=300):
+    """
+    Pede ao bot (se estiver rodando) que feche o Chrome compartilhado e espera o
+    perfil ficar livre. O pedido vale até clear_profile_release().
+
+    Returns:
+        bool: False se o perfil continuar em uso após 'timeout' segundos.
+    """
+    _write_release("requested")
+    deadline = time.monotonic() + timeout
+    while _profile_in_use(session_path):
+        try:
+            with open(RELEASE_FILE, "r", encoding="utf-8") as f:
+                if f.read().strip() == "released":
+                    # Dá tempo ao Chrome de remover os arquivos de trava do perfil
+                    time.sleep(2)
+                    return True
+        except OSError:
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(1)
+    return True
+
+def clear_profile_release():
+    """Devolve o perfil ao bot: o Chrome compartilhado volta a abrir no próximo uso."""
+    try:
+        os.remove(RELEASE_FILE)
+    except OSError:
+        pass
+
+class BrowserManager:
+    """
+    Mantém um único Chrome aquecido durante toda a vida do processo e o
+    compartilha entre os scrapers (Magazine Luiza, Link Builder do Mercado Livre).
+    Cada uso recebe uma aba própria via tab(); como o WebDriver atende uma aba
+    por vez, os usos são serializados por um lock. O Chrome é reiniciado quando
+    trava, quando o uso de memória passa de BROWSER_MAX_MEMORY_MB (requer psutil)
+    ou após BROWSER_MAX_USES abas.
+    """
+    def __init__(self, session_path):
+        self.session_path = session_path
+        self.driver = None
+        self.uses = 0
+        self.started_at = None
+        self._base_handle = None
+        self._lock = threading.RLock()
+        self._watcher = None
+        try:
+            self.max_memory_mb = float(os.getenv("BROWSER_MAX_MEMORY_MB", 1500))
+            self.max_uses = int(os.getenv("BROWSER_MAX_USES", 200))
+        except ValueError:
+            self.max_memory_mb, self.max_uses = 1500, 200
+        self.lean = os.getenv("BROWSER_LEAN", "0").lower() in ("1", "true", "yes")
+        # O ML bloqueia navegadores headless no Link Builder (403), por isso é opcional
+        self.headless = os.getenv("BROWSER_HEADLESS", "0").lower() in ("1", "true", "yes")
+        # Totais por página para comparar o modo enxuto com o completo
+        self.stats = {"pages": 0, "bytes": 0, "ms": 0}
+
+    def _build_options(self):
+        options = uc.ChromeOptions()
+        options.add_argument(f"--user-data-dir={self.session_path}")
+        options.add_argument("--disable-notifications")
+        # O undetected_chromedriver grava as prefs no perfil (sessao_chrome/Default/Preferences):
+        # as imagens ficam sempre liberadas aqui, desfazendo o bloqueio gravado por versões
+        # anteriores, e o modo enxuto bloqueia só na sessão, via CDP (_apply_blocking)
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 1})
+        if self.lean:
+            for argument in LEAN_ARGUMENTS:
+                options.add_argument(argument)
+        else:
+            options.add_argument("--start-maximized")
+        return options
+
+    def _start(self):
+        if uc is None:
+            raise RuntimeError(f"undetected_chromedriver não instalado: {uc_error}")
+        version = get_chrome_main_version()
+        if version:
+            print(f">>> [Browser] Chrome v{version} detectado.")
+        else:
+            version = FALLBACK_VERSION
+            print(f">>> [Browser] Versão não detectada, usando fallback v{version}")
+
+        # Reaproveita o chromedriver já baixado e corrigido pelo undetected_chromedriver
+        cached_driver = self._cached_driver(version)
+        print(">>> [Browser] Iniciando Chrome compartilhado...")
+        if cached_driver:
+            self.driver = uc.Chrome(options=self._build_options(), version_main=version,
+                                    driver_executable_path=cached_driver, headless=self.headless)
+        else:
+            self.driver = uc.Chrome(options=self._build_options(), version_main=version, headless=self.headless)
+            self._store_driver(version)
+        self._base_handle = self.driver.current_window_handle
+        self.started_at = time.time()
+        self.uses = 0
+        self._start_watcher()
+
+    def _start_watcher(self):
+        """Vigia pedidos de liberação do perfil enquanto o Chrome estiver aberto (ex: entre ciclos)."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(target=self._watch_release, name="browser-release", daemon=True)
+        self._watcher.start()
+
+    def _watch_release(self):
+        while self.driver is not None:
+            time.sleep(RELEASE_POLL_SECONDS)
+            # Com uma aba em uso, espera a próxima verificação
+            if release_requested() and self._lock.acquire(blocking=False):
+                try:
+                    self._release_profile()
+                finally:
+                    self._lock.release()
+                return
+
+    def _release_profile(self):
+        if self.driver is not None:
+            print(">>> [Browser] Login manual pediu o perfil do Chrome. Fechando o navegador compartilhado...")
+            self.shutdown()
+        _write_release("released")
+
+    def _cached_driver(self, version):
+        meta_file = DRIVER_FILE + ".json"
+        if not (os.path.exists(DRIVER_FILE) and os.path.exists(meta_file)):
+            return None
+        try:
+            with open(meta_file, "r", encoding="utf-8") as f:
+                if json.load(f).get("version") == version:
+                    return DRIVER_FILE
+        except Exception:
+            pass
+        return None
+
+    def _store_driver(self, version):
+        try:
+            source = self.driver.patcher.executable_path
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            shutil.copy2(source, DRIVER_FILE)
+            with open(DRIVER_FILE + ".json", "w", encoding="utf-8") as f:
+                json.dump({"version": version}, f)
+        except Exception as e:
+            print(f">>> [Browser] Aviso: Não foi possível guardar o chromedriver em cache: {e}")
+
+    def _memory_mb(self):
+        if psutil is None or self.driver is None:
+            return None
+        try:
+            process = psutil.Process(self.driver.browser_pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def _apply_blocking(self, driver):
+        """Bloqueia imagens, mídia, fontes e rastreadores na aba atual via CDP."""
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            print(f">>> [Browser] Aviso: Não foi possível bloquear recursos via CDP: {e}")
+
+    def prepare_tab(self, driver):
+        """Aplica o modo enxuto à aba atual (ex: abas abertas pela página com window.open)."""
+        if self.lean:
+            self._apply_blocking(driver)
+
+    def log_page(self, driver, label=""):
+        """
+        Registra quantos bytes e quanto tempo a página carregada na aba consumiu.
+        A média acumulada permite comparar BROWSER_LEAN=1 com BROWSER_LEAN=0.
+        """
+        try:
+            page = driver.execute_script(PAGE_STATS_JS) or {}
+        except Exception:
+            return None
+        self.stats["pages"] += 1
+        self.stats["bytes"] += page.get("bytes", 0)
+        self.stats["ms"] += page.get("ms", 0)
+        avg_kb = self.stats["bytes"] / self.stats["pages"] / 1024
+        avg_ms = self.stats["ms"] / self.stats["pages"]
+        mode = "enxuto" if self.lean else "completo"
+        print(f"   [Browser] {label} {page.get('bytes', 0) / 1024:.0f} KB em {page.get('requests', 0)} requisições, "
+              f"{page.get('ms', 0)} ms (média {mode}: {avg_kb:.0f} KB, {avg_ms:.0f} ms)")
+        return page
+
+    def _healthy(self):
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def _ensure(self):
+        if self.driver is not None:
+            memory = self._memory_mb()
+            if not self._healthy():
+                print(">>> [Browser] Chrome não responde. Reiniciando...")
+                self.shutdown()
+            elif memory is not None and memory > self.max_memory_mb:
+                print(f">>> [Browser] Chrome usando {memory:.0f} MB (> {self.max_memory_mb:.0f} MB). Reiniciando...")
+                self.shutdown()
+            elif self.uses >= self.max_uses:
+                print(f">>> [Browser] {self.uses} abas atendidas. Reciclando o Chrome...")
+                self.shutdown()
+        if self.driver is None:
+            self._start()
+        return self.driver
+
+    @contextmanager
+    def tab(self, cancelled=None):
+        """
+        Empresta uma aba nova do Chrome compartilhado.
+        Entrega None, sem abrir (ou reiniciar) o Chrome, se 'cancelled()' indicar
+        que o chamador foi interrompido enquanto esperava a vez ou se o perfil
+        estiver reservado para o login manual (request_profile_release).
+
+        Uso:
+            with get_browser_manager(session_path).tab() as driver:
+                driver.get(url)
+        """
+        with self._lock:
+            if cancelled is not None and cancelled():
+                yield None
+                return
+            if release_requested():
+                print(">>> [Browser] Perfil reservado para o login manual (login_ml_affiliate.py). Navegador indisponível.")
+                self._release_profile()
+                yield None
+                return
+            driver = self._ensure()
+            driver.switch_to.new_window("tab")
+            handle = driver.current_window_handle
+            self.prepare_tab(driver)
+            self.uses += 1
+            try:
+                yield driver
+            finally:
+                try:
+                    if handle in driver.window_handles:
+                        driver.switch_to.window(handle)
+                        driver.close()
+                    driver.switch_to.window(self._base_handle)
+                except Exception:
+                    # Chrome travou durante o uso: será reiniciado no próximo tab()
+                    pass
+
+    def kill(self):
+        """
+        Encerra o Chrome sem esperar o lock. Usado quando a aba em uso travou:
+        a chamada bloqueada no WebDriver falha e o próximo tab() abre outro Chrome.
+        """
+        driver, self.driver = self.driver, None
+        if driver is not None:
+            try:
+                driver.quit()
+                print(">>> [Browser] Navegador encerrado à força.")
+            except Exception:
+                pass
+
+    def shutdown(self):
+        """Fecha o Chrome compartilhado."""
+        with self._lock:
+            if self.driver is not None:
+                try:
+                    self.driver.quit()
+                    print(">>> [Browser] Navegador fechado.")
+                except Exception:
+                    pass
+                self.driver = None
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_browser_manager(session_path=None):
+    """Retorna o BrowserManager do perfil informado (um Chrome por perfil)."""
+    session_path = session_path or os.path.join(os.getcwd(), "sessao_chrome")
+    with _managers_lock:
+        manager = _managers.get(session_path)
+        if manager is None:
+            manager = BrowserManager(session_path)
+            _managers[session_path] = manager
+        return manager
+
+def shutdown_browsers():
+    """Fecha todos os navegadores compartilhados (chamado no encerramento)."""
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.shutdown()
+
+atexit.register(shutdown_browsers)
@@ -0,0 +1,6 @@
+# lxml é bem mais rápido que o html.parser embutido; usa-o quando estiver instalado
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
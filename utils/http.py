@@ -0,0 +1,101 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Timeout padrão (conexão, leitura) aplicado quando a chamada não informa um
+DEFAULT_TIMEOUT = (5, 30)
+
+# O urllib3 só decodifica Brotli se uma das bibliotecas estiver instalada
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+_sessions = {}
+_lock = threading.Lock()
+
+class TimeoutSession(requests.Session):
+    """Session que aplica um timeout padrão a todas as requisições."""
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+class CappedRetry(Retry):
+    """Retry que limita a espera pedida no cabeçalho Retry-After (429/503)."""
+    def __init__(self, *args, max_retry_after=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response):
+        seconds = super().get_retry_after(response)
+        if seconds is not None and self.max_retry_after is not None:
+            seconds = min(seconds, self.max_retry_after)
+        return seconds
+
+def _build_session(retry_post, timeout, retries, pool_size, read_retries, max_retry_after):
+    # Métodos reenviados automaticamente. POST só entra quando a chamada é uma
+    # consulta (ex: GraphQL da Shopee); publicações nunca são reenviadas aqui.
+    methods = set(Retry.DEFAULT_ALLOWED_METHODS)
+    if retry_post:
+        methods.add("POST")
+    retry = CappedRetry(
+        total=retries,
+        connect=retries,
+        read=retries if read_retries is None else read_retries,
+        status=retries,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(methods),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        max_retry_after=max_retry_after,
+    )
+    # O urllib3 mantém um pool de conexões keep-alive por host
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size, max_retries=retry)
+    session = TimeoutSession(timeout=timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+    return session
+
+def get_session(name="default", retry_post=False, timeout=DEFAULT_TIMEOUT, retries=3, pool_size=10, read_retries=None, max_retry_after=None):
+    """
+    Retorna a sessão HTTP compartilhada com o nome informado, criando-a na
+    primeira chamada. Reutilizar a sessão evita pagar DNS + TCP + TLS a cada
+    requisição: as conexões ficam abertas (keep-alive) no pool de cada host.
+    Os parâmetros só têm efeito na criação da sessão.
+
+    Args:
+        name (str): Nome da sessão (ex: 'default', 'graph', 'shopee').
+        retry_post (bool): Reenvia também POSTs em falhas temporárias.
+        timeout: Timeout padrão (segundos ou tupla conexão/leitura).
+        retries (int): Tentativas em falhas de conexão e status 429/5xx (respeita Retry-After).
+        pool_size (int): Conexões simultâneas mantidas por host.
+        read_retries (int): Tentativas após timeout de leitura (padrão: 'retries').
+            Com 0, o timeout de cada chamada limita de fato a requisição.
+        max_retry_after (float): Espera máxima, em segundos, entre tentativas
+            quando o servidor envia Retry-After (padrão: sem limite).
+    """
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _build_session(retry_post, timeout, retries, pool_size, read_retries, max_retry_after)
+                _sessions[name] = session
+    return session
@@ -1,7 +1,6 @@
 import os
 import io
 import textwrap
-import requests
 from PIL import Image, ImageDraw, ImageFont
 
 try:
@@ -10,6 +9,8 @@ try:
 except ImportError:
     svg2rlg = None
 
+from utils.http import get_session
+
 class ImageGenerator:
     """
     Classe utilitária para gerar imagens de ofertas com a identidade visual Achados Tec BR.
@@ -62,7 +63,7 @@ class ImageGenerator:
         try:
             # 1. Obter imagem do produto
             headers = {'User-Agent': 'Mozilla/5.0'}
-            resp = requests.get(deal_data['imagem'], headers=headers, timeout=15)
+            resp = get_session().get(deal_data['imagem'], headers=headers, timeout=15)
             resp.raise_for_status()
             original_img = Image.open(io.BytesIO(resp.content)).convert("RGBA")
 
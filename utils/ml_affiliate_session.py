@@ -0,0 +1,96 @@
+import os
+import json
+import time
+
+from utils.http import get_session
+
+SESSION_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_affiliate_session.json")
+
+LINKBUILDER_URL = "https://www.mercadolivre.com.br/afiliados/linkbuilder"
+CREATE_LINK_URL = "https://www.mercadolivre.com.br/affiliate-program/api/v2/affiliates/createLink"
+
+class SessionExpired(Exception):
+    """A sessão salva do Link Builder não é mais aceita (login necessário)."""
+    pass
+
+def save_session(cookies, csrf_token, user_agent):
+    """
+    Persiste os cookies autenticados, o token CSRF e o User-Agent do navegador
+    para que o createLink possa ser chamado via HTTP, sem abrir o Chrome.
+    """
+    data = {
+        "cookies": [{"name": c["name"], "value": c["value"], "domain": c.get("domain", "")} for c in cookies],
+        "csrf_token": csrf_token or "",
+        "user_agent": user_agent or "",
+        "saved_at": time.time()
+    }
+    with open(SESSION_FILE, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    print(f">>> [ML Affiliate] Sessão salva para uso sem navegador ({len(data['cookies'])} cookies).")
+
+def save_session_from_driver(driver):
+    """Extrai cookies, CSRF e User-Agent de um navegador já autenticado no Link Builder."""
+    csrf_token = driver.execute_script(
+        "const m = document.querySelector('meta[name=\"csrf-token\"]'); return m ? m.getAttribute('content') : '';"
+    )
+    user_agent = driver.execute_script("return navigator.userAgent;")
+    save_session(driver.get_cookies(), csrf_token, user_agent)
+
+def load_session():
+    """Retorna a sessão salva ou None se não existir."""
+    if not os.path.exists(SESSION_FILE):
+        return None
+    try:
+        with open(SESSION_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if data.get("cookies") else None
+    except Exception as e:
+        print(f">>> [ML Affiliate] Erro ao ler sessão salva: {e}")
+        return None
+
+def clear_session():
+    """Descarta a sessão salva (ex: quando o servidor a rejeita)."""
+    if os.path.exists(SESSION_FILE):
+        os.remove(SESSION_FILE)
+
+def create_links_http(urls, tag, session_data=None):
+    """
+    Chama o createLink diretamente via HTTP reaproveitando a sessão salva.
+
+    Returns:
+        tuple: (status HTTP, corpo da resposta)
+
+    Raises:
+        SessionExpired: Se não houver sessão salva ou se ela tiver expirado.
+    """
+    session_data = session_data or load_session()
+    if not session_data:
+        raise SessionExpired("Nenhuma sessão salva do Link Builder.")
+
+    headers = {
+        "accept": "application/json, text/plain, */*",
+        "accept-language": "pt-BR,pt;q=0.9,en-US;q=0.8",
+        "content-type": "application/json",
+        "origin": "https://www.mercadolivre.com.br",
+        "referer": LINKBUILDER_URL,
+        "x-csrf-token": session_data.get("csrf_token", ""),
+        "user-agent": session_data.get("user_agent") or "Mozilla/5.0",
+        "cookie": "; ".join(f"{c['name']}={c['value']}" for c in session_data["cookies"])
+    }
+    response = get_session("ml_affiliate").post(
+        CREATE_LINK_URL,
+        json={"urls": list(urls), "tag": tag},
+        headers=headers,
+        timeout=20,
+        allow_redirects=False
+    )
+
+    # Redirecionamento para o login ou acesso negado indicam sessão expirada
+    if response.status_code in (401, 403) or 300 <= response.status_code < 400:
+        raise SessionExpired(f"HTTP {response.status_code}")
+    if response.status_code == 200:
+        try:
+            response.json()
+        except ValueError:
+            raise SessionExpired("Resposta não é JSON (provável página de login).")
+    return response.status_code, response.text
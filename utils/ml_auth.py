@@ -3,7 +3,7 @@ import sys
 import time
 import json
 import urllib.parse
-import requests
+from utils.http import get_session
 
 TOKEN_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml_tokens.json")
 
@@ -45,7 +45,7 @@ def get_ml_tokens():
         }
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         try:
-            response = requests.post(url, data=payload, headers=headers, timeout=15)
+            response = get_session().post(url, data=payload, headers=headers, timeout=15)
             response.raise_for_status()
             res_data = response.json()
             
@@ -101,7 +101,7 @@ def get_ml_tokens():
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
     try:
-        response = requests.post(url, data=payload, headers=headers, timeout=15)
+        response = get_session().post(url, data=payload, headers=headers, timeout=15)
         response.raise_for_status()
         res_data = response.json()
         
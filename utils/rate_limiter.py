@@ -0,0 +1,59 @@
+import time
+import threading
+
+class TokenBucket:
+    """
+    Limitador de taxa (token bucket) seguro entre threads.
+    Libera até 'capacity' requisições de uma vez e repõe 'rate' fichas a cada
+    'per' segundos (ex: 2000 por hora na API de afiliados da Shopee).
+    """
+    def __init__(self, rate, per=3600.0, capacity=None):
+        self.rate = float(rate)
+        self.per = float(per)
+        self.capacity = float(capacity if capacity is not None else max(1.0, min(self.rate, 10.0)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate / self.per)
+        self.updated_at = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Espera até haver fichas disponíveis.
+
+        Returns:
+            bool: False se o tempo limite acabar antes de conseguir as fichas.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) * self.per / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+_buckets = {}
+_lock = threading.Lock()
+
+def get_rate_limiter(name, rate, per=3600.0, capacity=None):
+    """
+    Retorna o limitador compartilhado com o nome informado. Como os scrapers são
+    recriados a cada ciclo, o limitador vive no processo para que a cota seja
+    respeitada entre ciclos. Os parâmetros só têm efeito na criação.
+    """
+    with _lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = TokenBucket(rate, per, capacity)
+            _buckets[name] = bucket
+        return bucket